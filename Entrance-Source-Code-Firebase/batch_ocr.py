@@ -0,0 +1,187 @@
+"""
+Headless batch OCR over a directory tree of ID images.
+
+Each worker process loads its own PaddleOCR model once and then processes
+images from a shared queue; one JSON line per image is streamed to the
+output as soon as it is ready. With --shared-model the model is loaded once
+and the workers are forked from it (see ocr_pool.OCRWorkerPool), which also
+reports their start-up time and memory.
+
+Example:
+    python batch_ocr.py "../reference-codes/Sample IDs" --workers 4 --output results.jsonl
+    python batch_ocr.py captureIDs --crop   # archived full camera frames
+    python batch_ocr.py captureIDs --shared-model --workers 3 --max-tasks-per-child 200
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".jfif", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+# Set in each worker process by _init_worker
+_ocr_utils = None
+_crop = False
+
+
+def find_images(root):
+    """Return all image files under `root`, sorted for reproducible runs."""
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                paths.append(os.path.join(dirpath, filename))
+    return sorted(paths)
+
+
+def read_image(path):
+    """Read an image with OpenCV, including paths cv2.imread cannot open on Windows (non-ASCII)."""
+    data = np.fromfile(path, dtype=np.uint8)
+    if data.size == 0:
+        return None
+    return cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+def _init_worker(crop, quiet, profile, cpu_threads, load_model=True):
+    """Load the OCR pipeline and model once per worker process (unless the model was inherited)."""
+    global _ocr_utils, _crop
+    # The pipeline prints its progress; keep stdout free for the JSONL stream
+    sys.stdout = open(os.devnull, "w") if quiet else sys.stderr
+    import ocr_utils
+    if load_model:
+        overrides = {"cpu_threads": cpu_threads} if cpu_threads else {}
+        ocr_utils.configure_engine(profile, **overrides)
+        ocr_utils.get_ocr()
+    _ocr_utils = ocr_utils
+    _crop = crop
+
+
+def _process(path):
+    record = {"path": path}
+    start = time.perf_counter()
+    try:
+        image = read_image(path)
+        if image is None:
+            record["error"] = "unreadable image"
+            return record
+        decoded = time.perf_counter()
+
+        if _crop:
+            image = _ocr_utils.crop_card(image)
+        cropped = time.perf_counter()
+
+        # Different cards of the same type can be perceptually close; never reuse results in batch mode
+        scan = _ocr_utils.scan_id(image, use_cache=False)
+        done = time.perf_counter()
+
+        record.update(
+            id_type=scan["id_type"],
+            id_number=scan["id_number"],  # Already masked by extract_registration_number
+            id_number_valid=scan["id_number_valid"],
+            name=scan["name"],
+            confidence=round(scan["confidence"], 4),
+            field_confidence={field: round(score, 4) for field, score in scan["field_confidence"].items()},
+            timings={
+                "decode": round(decoded - start, 4),
+                "crop": round(cropped - decoded, 4),
+                "ocr": round(done - cropped, 4),
+                "total": round(done - start, 4),
+            },
+            stages={stage: round(seconds, 4) for stage, seconds in scan["timings"].items()},
+        )
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+
+def print_pool_report(report):
+    """Print an OCRWorkerPool.report() to stderr."""
+    def mb(value):
+        return "n/a" if value is None else f"{value:.0f} MB"
+
+    load = f", model load {report['model_load']:.1f}s in the parent" if report["model_load"] is not None else ""
+    print(f"Worker pool: shared model {'yes' if report['shared_model'] else 'no'}{load}, "
+          f"{report['workers_started']} worker(s) started", file=sys.stderr)
+    print(f"  parent        RSS {mb(report['parent']['rss_mb']):>8}  PSS {mb(report['parent']['pss_mb']):>8}",
+          file=sys.stderr)
+    for pid, worker in report["workers"].items():
+        print(f"  worker {pid:<6} RSS {mb(worker['rss_mb']):>8}  PSS {mb(worker['pss_mb']):>8}  "
+              f"start-up {worker['init'] * 1000:.1f} ms (ready {worker['ready_after']:.2f}s after pool start)",
+              file=sys.stderr)
+    print(f"  total         RSS {mb(report['total']['rss_mb']):>8}  PSS {mb(report['total']['pss_mb']):>8}",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ID OCR pipeline over a directory of images.")
+    parser.add_argument("root", help="Directory to scan recursively for images")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of worker processes (each with its own PaddleOCR model unless --shared-model)")
+    parser.add_argument("--crop", action="store_true",
+                        help="Localise and rectify the card inside the guide box first (for raw camera frames)")
+    parser.add_argument("--quiet", action="store_true", help="Suppress the pipeline's progress output")
+    parser.add_argument("--profile", help="OCR engine profile (see ocr_utils.ENGINE_PROFILES)")
+    parser.add_argument("--cpu-threads", type=int,
+                        help="CPU threads per worker's model; keep workers x threads <= cores")
+    parser.add_argument("--shared-model", action="store_true",
+                        help="Load the model once and fork the workers from it (Linux; they share its memory)")
+    parser.add_argument("--max-tasks-per-child", type=int,
+                        help="Replace a worker after this many images")
+    args = parser.parse_args(argv)
+
+    paths = find_images(args.root)
+    if not paths:
+        print(f"No images found under {args.root}", file=sys.stderr)
+        return 1
+    print(f"Processing {len(paths)} images with {args.workers} worker(s)...", file=sys.stderr)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    failures = 0
+    report = None
+    try:
+        if args.shared_model:
+            from ocr_pool import OCRWorkerPool
+            overrides = {"cpu_threads": args.cpu_threads} if args.cpu_threads else {}
+            # Workers inherit the model (or, without fork, the pool loads one in each); _init_worker only sets up
+            pool = OCRWorkerPool(args.workers, args.max_tasks_per_child, args.profile, initializer=_init_worker,
+                                 initargs=(args.crop, args.quiet, args.profile, args.cpu_threads, False), **overrides)
+            # The model loads in this process; keep its progress output off the JSONL stream
+            with contextlib.redirect_stdout(sys.stderr):
+                pool.start()
+        else:
+            pool = Pool(args.workers, initializer=_init_worker,
+                        initargs=(args.crop, args.quiet, args.profile, args.cpu_threads),
+                        maxtasksperchild=args.max_tasks_per_child)
+        try:
+            for record in pool.imap_unordered(_process, paths, chunksize=1):
+                failures += "error" in record
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+        except BaseException:
+            pool.terminate()
+            raise
+        if args.shared_model:
+            report = pool.report()
+        pool.close()
+        pool.join()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Done: {len(paths)} images in {elapsed:.1f}s ({len(paths) / elapsed:.2f} img/s), {failures} failed",
+          file=sys.stderr)
+    if report:
+        print_pool_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
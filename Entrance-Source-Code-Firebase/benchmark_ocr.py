@@ -0,0 +1,540 @@
+"""
+Benchmarks for the entrance OCR pipeline.
+
+    python benchmark_ocr.py corpus                          # accuracy and per-stage latency on the sample IDs
+    python benchmark_ocr.py corpus --save baseline.json     # keep the report as a baseline
+    python benchmark_ocr.py corpus --compare baseline.json  # diff against a saved baseline
+    python benchmark_ocr.py startup                         # import, model load and warm-up times
+    python benchmark_ocr.py profiles                        # latency/accuracy of each engine profile
+    python benchmark_ocr.py cleanup                         # name cleanup (unwanted labels) on long OCR strings
+    python benchmark_ocr.py regex                           # worst-case name extraction time on adversarial text
+
+Ground truth lives in benchmark_ground_truth.json next to this script.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import numpy as np
+from thefuzz import fuzz, process
+from batch_ocr import read_image
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_GROUND_TRUTH = os.path.join(script_dir, "benchmark_ground_truth.json")
+
+# Pipeline stages reported by the corpus benchmark, in execution order
+STAGES = ("hash", "preprocess", "det", "crop", "cls", "rec_coarse", "rec", "detect_id_type", "layout", "extract_registration_number", "extract_name", "rec_retry", "total")
+
+
+def percentiles(values):
+    """Summarise a list of durations in seconds as millisecond percentiles."""
+    if not values:
+        return {"n": 0}
+    ms = np.asarray(values, dtype=np.float64) * 1000.0
+    return {
+        "n": int(ms.size),
+        "mean": round(float(ms.mean()), 2),
+        "p50": round(float(np.percentile(ms, 50)), 2),
+        "p90": round(float(np.percentile(ms, 90)), 2),
+        "p95": round(float(np.percentile(ms, 95)), 2),
+        "p99": round(float(np.percentile(ms, 99)), 2),
+        "max": round(float(ms.max()), 2),
+    }
+
+
+def load_ground_truth(path):
+    """Return (image root directory, {relative path: expected fields})."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    root = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(path)), data["root"]))
+    return root, data["images"]
+
+
+def normalize_name(name):
+    return re.sub(r"\s+", " ", re.sub(r"[^A-Z\s]", " ", name.upper())).strip()
+
+
+def name_matches(extracted, expected):
+    """Exact match after normalising case, punctuation and spacing."""
+    return normalize_name(extracted) == normalize_name(expected)
+
+
+def number_matches(masked, expected):
+    """
+    Compare a masked ID number with the expected full number.
+
+    Separators are ignored; the lengths must agree and every unmasked
+    character must equal the expected character at the same position.
+    """
+    masked = re.sub(r"[^A-Z0-9*]", "", masked.upper())
+    expected = re.sub(r"[^A-Z0-9]", "", expected.upper())
+    if len(masked) != len(expected):
+        return False
+    return all(m == "*" or m == e for m, e in zip(masked, expected))
+
+
+def run_stages(ocr_utils, image, mode=None):
+    """Run the pipeline on one image. Returns (fields, per-stage timings in seconds)."""
+    # The pipeline prints its intermediate results; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        scan = ocr_utils.scan_id(image, use_cache=False, mode=mode)
+    fields = {"id_type": scan["id_type"], "id_number": scan["id_number"], "name": scan["name"]}
+    return fields, scan["timings"]
+
+
+def score_fields(fields, expected):
+    """Return {field: True/False} for each annotated field."""
+    scores = {"id_type": fields["id_type"] == expected["id_type"]}
+    if expected.get("id_number"):
+        scores["id_number"] = number_matches(fields["id_number"], expected["id_number"])
+    if expected.get("name"):
+        scores["name"] = name_matches(fields["name"], expected["name"])
+    return scores
+
+
+def summarise_accuracy(per_image):
+    """Field accuracy per expected ID type and overall: {group: {field: {"correct", "total", "accuracy"}}}."""
+    groups = {}
+    for record in per_image:
+        for group in (record["expected_type"], "overall"):
+            for field, correct in record["correct"].items():
+                counts = groups.setdefault(group, {}).setdefault(field, {"correct": 0, "total": 0})
+                counts["correct"] += int(correct)
+                counts["total"] += 1
+    for fields in groups.values():
+        for counts in fields.values():
+            counts["accuracy"] = round(counts["correct"] / counts["total"], 4)
+    return groups
+
+
+def print_report(report):
+    print("\nLatency (ms)")
+    print(f"  {'stage':<30}{'mean':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for stage, stats in report["latency_ms"].items():
+        if stats.get("n"):
+            print(f"  {stage:<30}" + "".join(f"{stats[key]:>9.1f}" for key in ("mean", "p50", "p90", "p95", "p99", "max")))
+
+    print("\nAccuracy")
+    for group, fields in report["accuracy"].items():
+        summary = ", ".join(f"{field} {c['correct']}/{c['total']} ({c['accuracy']:.0%})" for field, c in fields.items())
+        print(f"  {group:<34}{summary}")
+
+
+def compare_reports(current, baseline, max_slowdown):
+    """Print the difference to a baseline. Returns True if it is a regression."""
+    regressed = False
+    print(f"\nCompared with baseline ({baseline['meta'].get('created', 'unknown date')})")
+    for stage, stats in current["latency_ms"].items():
+        base = baseline["latency_ms"].get(stage, {})
+        if not stats.get("n") or not base.get("n"):
+            continue
+        for key in ("p50", "p95"):
+            delta = stats[key] - base[key]
+            pct = (delta / base[key] * 100.0) if base[key] else 0.0
+            flag = ""
+            if stage == "total" and pct > max_slowdown:
+                flag, regressed = "  <-- slower than allowed", True
+            print(f"  {stage:<30}{key} {base[key]:>9.1f} -> {stats[key]:>9.1f} ms ({pct:+.1f}%){flag}")
+
+    for group, fields in current["accuracy"].items():
+        for field, counts in fields.items():
+            base = baseline["accuracy"].get(group, {}).get(field)
+            if base is None:
+                continue
+            delta = counts["accuracy"] - base["accuracy"]
+            flag = ""
+            if delta < 0:
+                flag, regressed = "  <-- accuracy dropped", True
+            if delta or flag:
+                print(f"  {group:<34}{field} {base['accuracy']:.0%} -> {counts['accuracy']:.0%}{flag}")
+    return regressed
+
+
+def bench_corpus(args):
+    import ocr_utils
+
+    settings = ocr_utils.configure_engine(args.profile)
+    print(f"Engine profile: {args.profile or 'default'} {settings}", file=sys.stderr)
+
+    root, expected_fields = load_ground_truth(args.ground_truth)
+    images = {}
+    for relative_path in expected_fields:
+        image = read_image(os.path.join(root, relative_path))
+        if image is None:
+            print(f"Skipping unreadable image {relative_path}", file=sys.stderr)
+            continue
+        images[relative_path] = image
+    if not images:
+        print(f"No images found under {root}", file=sys.stderr)
+        return 1
+
+    # The first inference pays one-off initialisation costs; keep it out of the figures
+    for _ in range(args.warmup):
+        run_stages(ocr_utils, next(iter(images.values())), args.mode)
+
+    stage_times = {stage: [] for stage in STAGES}
+    per_image = []
+    for relative_path, image in images.items():
+        expected = expected_fields[relative_path]
+        for _ in range(args.repeat):
+            fields, timings = run_stages(ocr_utils, image, args.mode)
+            for stage in STAGES:
+                if stage in timings:  # Recognition stages are skipped when no text is detected
+                    stage_times[stage].append(timings[stage])
+        record = {
+            "path": relative_path,
+            "expected_type": expected["id_type"],
+            "fields": fields,
+            "correct": score_fields(fields, expected),
+            "total_ms": round(timings["total"] * 1000.0, 2),
+        }
+        per_image.append(record)
+        print(f"{record['total_ms']:>9.1f} ms  {relative_path}: {fields['id_type']} | {fields['id_number']} | {fields['name']}",
+              file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "images": len(images),
+            "repeat": args.repeat,
+            "ground_truth": os.path.basename(args.ground_truth),
+            "profile": args.profile or "default",
+            "mode": args.mode or ocr_utils.RECOGNITION_MODE,
+        },
+        "latency_ms": {stage: percentiles(values) for stage, values in stage_times.items()},
+        "accuracy": summarise_accuracy(per_image),
+        "per_image": per_image,
+    }
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"\nSaved report to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if compare_reports(report, baseline, args.max_slowdown):
+            return 2
+    return 0
+
+
+# Modules whose import time delays the kiosk window appearing
+STARTUP_MODULES = ("ocr_utils", "ocr_worker", "main")
+
+# Run in a fresh interpreter so nothing is already imported or loaded
+MODEL_STARTUP_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import ocr_utils
+t1 = time.perf_counter()
+ocr_utils.get_ocr()
+t2 = time.perf_counter()
+card = ocr_utils.make_dummy_card()
+ocr_utils.run_ocr(card)
+t3 = time.perf_counter()
+ocr_utils.run_ocr(card)
+t4 = time.perf_counter()
+print(json.dumps({"import ocr_utils": t1 - t0, "model load": t2 - t1, "first inference": t3 - t2, "second inference": t4 - t3}))
+"""
+
+
+def run_python(code):
+    """Run `code` in a fresh interpreter in this directory and return its last stdout line."""
+    completed = subprocess.run([sys.executable, "-c", code], cwd=script_dir, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def bench_startup(args):
+    timings = {}
+    for module in STARTUP_MODULES:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        try:
+            timings[f"import {module}"] = [float(run_python(code)) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"import {module}: {e}", file=sys.stderr)
+
+    if not args.skip_model:
+        for _ in range(args.repeat):
+            for stage, seconds in json.loads(run_python(MODEL_STARTUP_SCRIPT)).items():
+                timings.setdefault(stage, []).append(seconds)
+
+    report = {
+        "meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat},
+        "latency_ms": {stage: percentiles(values) for stage, values in timings.items()},
+    }
+    print(f"\n  {'startup step':<30}{'mean':>9}{'p50':>9}{'max':>9}   (ms, {args.repeat} fresh process(es))")
+    for stage, stats in report["latency_ms"].items():
+        print(f"  {stage:<30}{stats['mean']:>9.1f}{stats['p50']:>9.1f}{stats['max']:>9.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"\nSaved report to {args.save}")
+    return 0
+
+
+def bench_profiles(args):
+    """Run the corpus benchmark once per engine profile, each in its own process, and tabulate the tradeoff."""
+    from ocr_utils import ENGINE_PROFILES
+
+    rows = []
+    for profile in args.profiles or list(ENGINE_PROFILES):
+        report_path = os.path.join(script_dir, f".profile-{profile}.json")
+        command = [sys.executable, os.path.abspath(__file__), "corpus", "--profile", profile,
+                   "--ground-truth", args.ground_truth, "--repeat", str(args.repeat), "--save", report_path]
+        print(f"Benchmarking profile '{profile}'...", file=sys.stderr)
+        completed = subprocess.run(command, cwd=script_dir, capture_output=True, text=True)
+        if completed.returncode != 0 or not os.path.exists(report_path):
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+            rows.append((profile, None, error))
+            continue
+        with open(report_path, encoding="utf-8") as fh:
+            rows.append((profile, json.load(fh), None))
+        os.remove(report_path)
+
+    print(f"\n  {'profile':<10}{'p50 ms':>9}{'p95 ms':>9}{'rec p50':>9}{'type':>7}{'number':>8}{'name':>7}")
+    for profile, report, error in rows:
+        if report is None:
+            print(f"  {profile:<10}skipped: {error}")
+            continue
+        total, rec = report["latency_ms"]["total"], report["latency_ms"].get("rec", {})
+        overall = report["accuracy"].get("overall", {})
+        accuracy = [f"{overall[field]['accuracy']:.0%}" if field in overall else "-" for field in ("id_type", "id_number", "name")]
+        print(f"  {profile:<10}{total['p50']:>9.1f}{total['p95']:>9.1f}{rec.get('p50', 0.0):>9.1f}"
+              f"{accuracy[0]:>7}{accuracy[1]:>8}{accuracy[2]:>7}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({profile: report for profile, report, _ in rows if report is not None}, fh, indent=2)
+        print(f"\nSaved reports to {args.save}")
+    return 0
+
+
+# Words a name is made of in the cleanup benchmark, mixed with each card's labels
+CLEANUP_NAME_WORDS = ("JUAN", "DELA", "CRUZ", "MARIA", "SANTOS", "REYES", "GARCIA", "MARTIN", "GERARD", "APOLINARIO",
+                      "ANDRES", "WRIGHT", "MAE", "DALE", "EVANGELISTA", "DANIOLCO", "BELCHEZ", "MORANTE")
+
+
+def legacy_fuzzy_match(text, keywords, threshold=70):
+    """The keyword of `keywords` that partially matches `text` best if it scores `threshold`, else `text`."""
+    if not text or not keywords:
+        return text
+    best_match, score = process.extractOne(text, keywords, scorer=fuzz.partial_ratio, processor=lambda x: x.lower())
+    return best_match if score >= threshold else text
+
+
+def legacy_remove_unwanted(text, table, threshold=70):
+    """
+    The cleanup UnwantedWords replaced, kept as the reference for `cleanup`:
+    a fuzzy match of every (word, pattern) of `table` against the whole text,
+    then a substitution and a whitespace pass per hit.
+    """
+    for word, pattern in table:
+        if legacy_fuzzy_match(text, [word], threshold) == word:
+            text = pattern.sub('', text)
+            text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def cleanup_text(rng, labels, length, typo_rate=0.3):
+    """A noisy OCR string of `length` words: name words with a label (misread now and then) every few words."""
+    words = []
+    while len(words) < length:
+        if rng.random() < 0.3:
+            label = list(labels[rng.integers(len(labels))])
+            if rng.random() < typo_rate:
+                label[rng.integers(len(label))] = "l" if rng.random() < 0.5 else "e"
+            words.extend("".join(label).split())
+        else:
+            words.append(CLEANUP_NAME_WORDS[rng.integers(len(CLEANUP_NAME_WORDS))])
+    return " ".join(words[:length])
+
+
+def bench_cleanup(args):
+    """Time the removal of each card's unwanted labels from long OCR strings, against the per-phrase loop it replaced."""
+    from id_templates import ID_TEMPLATES
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    for id_type, template in ID_TEMPLATES.items():
+        labels = template.unwanted.words
+        if not labels:
+            continue
+        table = [(word, re.compile(re.escape(word), re.IGNORECASE)) for word in labels]
+        for length in args.words:
+            texts = [cleanup_text(rng, labels, length) for _ in range(args.samples)]
+            timings = {}
+            for name, clean in (("legacy", lambda text: legacy_remove_unwanted(text, table)),
+                                ("batched", template.unwanted.remove)):
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    for text in texts:
+                        clean(text)
+                timings[name] = (time.perf_counter() - start) / (args.repeat * len(texts))
+            rows.append({"id_type": id_type, "words": length, "labels": len(labels),
+                         "legacy_ms": round(timings["legacy"] * 1000.0, 4),
+                         "batched_ms": round(timings["batched"] * 1000.0, 4),
+                         "speedup": round(timings["legacy"] / timings["batched"], 2)})
+
+    print(f"\n  {'id type':<34}{'words':>6}{'labels':>7}{'legacy ms':>11}{'batched ms':>12}{'speed-up':>10}")
+    for row in rows:
+        print(f"  {row['id_type']:<34}{row['words']:>6}{row['labels']:>7}{row['legacy_ms']:>11.3f}"
+              f"{row['batched_ms']:>12.3f}{row['speedup']:>9.1f}x")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "samples": args.samples,
+                                "repeat": args.repeat, "seed": args.seed}, "cleanup": rows}, fh, indent=2)
+        print(f"\nSaved report to {args.save}")
+    return 0
+
+
+# A well-read card of each type and the label its name follows; the adversarial texts of the
+# regex benchmark are built around them
+REGEX_SAMPLES = {
+    "Philippine National ID": (
+        "PAMBANSANG PAGKAKAKILANLAN Philippine Identification Card 1234-5678-9101-1213 Apelyido/Last Name DELA CRUZ "
+        "Mga Pangalan/Given Names JUAN Gitnang Apelyido/Middle Name SANTOS Petsa ng Kapanganakan/Date of Birth",
+        "Apelyido/Last Name"),
+    "Driver's License": (
+        "LAND TRANSPORTATION OFFICE NON-PROFESSIONAL DRIVER'S LICENSE Last Name, First Name, Middle Name "
+        "DELA CRUZ, JUAN SANTOS Nationality PHL Sex M License No. N01-23-456789",
+        "Last Name, First Name, Middle Name"),
+    "Postal ID": (
+        "Philippine Postal Corporation POSTAL IDENTITY CARD JUAN DELA CRUZ 123 MAIN ST PRN 100141234567P",
+        "IDENTITY CARD"),
+    "Unified Multi-Purpose ID/SSS ID": (
+        "Unified Multi-Purpose ID CRN-0028-1215160-9 SURNAME DELA CRUZ GIVEN NAME JUAN MIDDLE NAME SANTOS SEX M",
+        "SURNAME"),
+    "PRC ID": (
+        "PROFESSIONAL REGULATION COMMISSION LAST NAME DELA CRUZ FIRST NAME JUAN MIDDLE NAME SANTOS "
+        "REGISTRATION NO 0012345",
+        "LAST NAME"),
+    "PhilHealth ID": (
+        "PhilHealth 12-34567891-2 DELA CRUZ, JUAN SANTOS JANUARY 01, 1990 MALE",
+        "12-34567891-2"),
+}
+
+
+def regex_texts(sample, label, length, rng):
+    """
+    Adversarial OCR strings of about `length` characters built around a card's `sample` text and
+    the `label` before its name. Most end in a character no name can contain, so that a pattern
+    that cannot find the end of the name tries every way of reading it before giving up.
+    """
+    alphabet = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-,. "))
+    return {
+        "repeated card": ((sample + " ") * (length // len(sample) + 1))[:length],
+        "repeated label": (label + " JUAN ") * (length // (len(label) + 6)) + "/",
+        "endless name": label + " " + "A" * length + " /",
+        "endless words": label + " " + "AB " * (length // 3) + "/",
+        "blank runs": label + " " * length + "JUAN" + " " * length + "/",
+        "noise": "".join(rng.choice(alphabet, size=length)),
+    }
+
+
+def bench_regex(args):
+    """
+    Time every name extraction branch (the IDTemplate.find_name behind
+    ocr_utils.extract_name) on adversarial OCR strings of growing length.
+
+    The worst time per branch should grow no faster than the text; a branch
+    whose time grows with the square of the length backtracks.
+    """
+    from id_templates import ID_TEMPLATES
+
+    rng = np.random.default_rng(args.seed)
+    rows = []
+    for id_type, (sample, label) in REGEX_SAMPLES.items():
+        template = ID_TEMPLATES[id_type]
+        for length in args.chars:
+            for variant, text in regex_texts(sample, label, length, rng).items():
+                runs = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    template.find_name(text)
+                    runs.append(time.perf_counter() - start)
+                rows.append({"id_type": id_type, "variant": variant, "chars": len(text),
+                             "ms": round(min(runs) * 1000.0, 3)})
+
+    print(f"\n  {'id type':<34}{'variant':<16}" + "".join(f"{length:>10}" for length in args.chars) + "   (ms per name)")
+    table = {}
+    for row in rows:
+        table.setdefault((row["id_type"], row["variant"]), []).append(row["ms"])
+    for (id_type, variant), times in table.items():
+        print(f"  {id_type:<34}{variant:<16}" + "".join(f"{ms:>10.2f}" for ms in times))
+
+    slowest = max(rows, key=lambda row: row["ms"])
+    print(f"\nSlowest: {slowest['ms']:.1f} ms ({slowest['id_type']}, {slowest['variant']}, {slowest['chars']} chars)")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "repeat": args.repeat,
+                                "seed": args.seed}, "regex": rows}, fh, indent=2)
+        print(f"\nSaved report to {args.save}")
+    if args.max_ms is not None and slowest["ms"] > args.max_ms:
+        return 2
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the entrance OCR pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    corpus = subparsers.add_parser("corpus", help="Accuracy and per-stage latency on the sample ID corpus")
+    corpus.add_argument("--ground-truth", default=DEFAULT_GROUND_TRUTH, help="Annotation file (JSON)")
+    corpus.add_argument("--repeat", type=int, default=1, help="Timed runs per image")
+    corpus.add_argument("--warmup", type=int, default=1, help="Untimed runs before measuring")
+    corpus.add_argument("--save", help="Write the report to this JSON file (use as a baseline)")
+    corpus.add_argument("--compare", help="Baseline report to diff against")
+    corpus.add_argument("--max-slowdown", type=float, default=10.0,
+                        help="Allowed p50/p95 total latency increase over the baseline, in percent")
+    corpus.add_argument("--profile", help="OCR engine profile (default: OCR_ENGINE_PROFILE or 'default')")
+    corpus.add_argument("--mode", choices=("fields", "full"),
+                        help="Recognition mode (default: OCR_RECOGNITION_MODE or 'fields')")
+    corpus.set_defaults(func=bench_corpus)
+
+    startup = subparsers.add_parser("startup", help="Import, model load and warm-up times in fresh processes")
+    startup.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement")
+    startup.add_argument("--skip-model", action="store_true", help="Only measure module import times")
+    startup.add_argument("--save", help="Write the report to this JSON file")
+    startup.set_defaults(func=bench_startup)
+
+    profiles = subparsers.add_parser("profiles", help="Latency/accuracy tradeoff of each OCR engine profile")
+    profiles.add_argument("profiles", nargs="*", help="Profiles to compare (default: all)")
+    profiles.add_argument("--ground-truth", default=DEFAULT_GROUND_TRUTH, help="Annotation file (JSON)")
+    profiles.add_argument("--repeat", type=int, default=1, help="Timed runs per image")
+    profiles.add_argument("--save", help="Write all profile reports to this JSON file")
+    profiles.set_defaults(func=bench_profiles)
+
+    cleanup = subparsers.add_parser("cleanup", help="Name cleanup (removal of card labels) on long OCR strings")
+    cleanup.add_argument("--words", type=int, nargs="+", default=[8, 32, 128, 512], help="OCR string lengths, in words")
+    cleanup.add_argument("--samples", type=int, default=20, help="Random strings per length and ID type")
+    cleanup.add_argument("--repeat", type=int, default=5, help="Timed passes over the strings")
+    cleanup.add_argument("--seed", type=int, default=0, help="Seed of the random strings")
+    cleanup.add_argument("--save", help="Write the report to this JSON file")
+    cleanup.set_defaults(func=bench_cleanup)
+
+    regex = subparsers.add_parser("regex", help="Worst-case name extraction time on adversarial OCR strings")
+    regex.add_argument("--chars", type=int, nargs="+", default=[1000, 4000, 16000], help="Text lengths, in characters")
+    regex.add_argument("--repeat", type=int, default=3, help="Timed runs per text (the fastest counts)")
+    regex.add_argument("--seed", type=int, default=0, help="Seed of the random noise")
+    regex.add_argument("--max-ms", type=float, help="Exit with status 2 if any name takes longer than this")
+    regex.add_argument("--save", help="Write the report to this JSON file")
+    regex.set_defaults(func=bench_regex)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
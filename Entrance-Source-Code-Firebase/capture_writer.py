@@ -0,0 +1,49 @@
+import os
+import queue
+import threading
+import uuid
+import cv2
+
+
+class CaptureWriter:
+    """
+    Persists captured ID frames to disk on a background thread.
+
+    The OCR path works on the in-memory frame, so saving a copy is optional
+    and never delays recognition. When the queue is full the frame is dropped
+    rather than blocking the caller.
+    """
+
+    def __init__(self, directory="captureIDs", max_pending=16):
+        self.directory = directory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="CaptureWriter", daemon=True)
+        self._thread.start()
+
+    def save(self, image):
+        """Queue an image for writing. Returns the target path, or None if the frame was dropped."""
+        image_path = os.path.join(self.directory, f"captured_id_{uuid.uuid4().hex}.jpg")
+        try:
+            self._queue.put_nowait((image_path, image))
+        except queue.Full:
+            print("Capture writer queue full, dropping frame")
+            return None
+        return image_path
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            image_path, image = item
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                if not cv2.imwrite(image_path, image):
+                    print(f"Failed to save capture to {image_path}")
+            except Exception as e:
+                print(f"Error saving capture: {e}")
+
+    def close(self):
+        """Flush pending writes and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
@@ -0,0 +1,143 @@
+from collections import deque
+import cv2
+import numpy as np
+
+# Quality thresholds for a frame to be worth an OCR run (tune per camera)
+SHARPNESS_MIN = 100.0   # Variance of the Laplacian; lower means blurred
+GLARE_MAX = 0.02        # Fraction of saturated pixels in the card region
+MOTION_MAX = 6.0        # Mean absolute difference to the previous frame (0-255)
+SATURATION_LEVEL = 250  # Gray level treated as blown-out glare
+MOTION_WIDTH = 160      # Width the region is downsampled to for the motion check
+
+# Stability-triggered capture
+STABLE_MOTION_MAX = 3.0  # Motion below this counts as "held still"
+STABLE_FRAMES = 5        # Consecutive still frames required (~170 ms at 30 fps)
+MAX_WAIT_SECONDS = 5.0   # Capture anyway after this long
+
+
+def downsample(gray, width=MOTION_WIDTH):
+    """Shrink a grayscale image to `width` pixels wide for cheap frame-to-frame comparisons."""
+    h, w = gray.shape[:2]
+    if w <= width:
+        return gray
+    return cv2.resize(gray, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA)
+
+
+def frame_quality(gray, previous_small=None):
+    """
+    Score a grayscale card region for sharpness, glare and motion.
+
+    `previous_small` is the downsampled region of the previous frame (as returned
+    in the "small" key); motion is 0 when it is not given. All measures are
+    whole-array NumPy/OpenCV operations, so scoring costs well under a
+    millisecond per frame for the guide-box region.
+    """
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    glare = float(np.count_nonzero(gray >= SATURATION_LEVEL)) / gray.size
+
+    small = downsample(gray)
+    motion = 0.0
+    if previous_small is not None and previous_small.shape == small.shape:
+        motion = float(cv2.absdiff(small, previous_small).mean())
+
+    ok = sharpness >= SHARPNESS_MIN and glare <= GLARE_MAX and motion <= MOTION_MAX
+    # Prefer sharp frames, penalising glare and motion even when they are under the limits
+    score = sharpness * (1.0 - min(glare / GLARE_MAX, 1.0) * 0.5) / (1.0 + motion)
+
+    return {
+        "sharpness": sharpness,
+        "glare": glare,
+        "motion": motion,
+        "score": score,
+        "ok": ok,
+        "small": small,
+    }
+
+
+class FrameBuffer:
+    """Rolling buffer of recent frames with their quality scores."""
+
+    def __init__(self, size=8, region=None):
+        """
+        `region` is an optional (x1, y1, x2, y2) box that quality is measured on,
+        typically the guide box; the full frame is kept for capture.
+        """
+        self.region = region
+        self._frames = deque(maxlen=size)
+        self._previous_small = None
+
+    def push(self, gray_frame, visit=None):
+        """
+        Score a frame and add it to the buffer. Returns its quality record, which
+        keeps `visit` (who the frame was taken for) so `best_n` can leave out other visitors.
+        """
+        if self.region is not None:
+            x1, y1, x2, y2 = self.region
+            card_region = gray_frame[y1:y2, x1:x2]
+        else:
+            card_region = gray_frame
+        quality = frame_quality(card_region, self._previous_small)
+        quality["visit"] = visit
+        self._previous_small = quality["small"]
+        self._frames.append((gray_frame, quality))
+        return quality
+
+    def best_n(self, n, visit=None):
+        """Return up to `n` (frame, quality) pairs that pass the gate, best first; only `visit`'s frames if given."""
+        passing = [item for item in self._frames
+                   if item[1]["ok"] and (visit is None or item[1]["visit"] == visit)]
+        return sorted(passing, key=lambda item: item[1]["score"], reverse=True)[:n]
+
+    def clear(self):
+        self._frames.clear()
+        self._previous_small = None
+
+    def __len__(self):
+        return len(self._frames)
+
+
+class StabilityDetector:
+    """
+    Decides when a presented card has been held still long enough to capture.
+
+    Feed it the motion measure of each new frame (see `frame_quality`); it
+    reports "stable" after `stable_frames` consecutive frames under
+    `motion_threshold`, "timeout" once `max_wait` seconds have passed since
+    `reset`, and "waiting" otherwise.
+    """
+
+    def __init__(self, motion_threshold=STABLE_MOTION_MAX, stable_frames=STABLE_FRAMES, max_wait=MAX_WAIT_SECONDS):
+        self.motion_threshold = motion_threshold
+        self.stable_frames = stable_frames
+        self.max_wait = max_wait
+        self.started_at = None
+        self.still_count = 0
+        self.frames_seen = 0
+
+    def reset(self, now):
+        self.started_at = now
+        self.still_count = 0
+        self.frames_seen = 0
+
+    def remaining(self, now):
+        """Seconds left before the maximum wait forces a capture."""
+        if self.started_at is None:
+            return self.max_wait
+        return max(0.0, self.max_wait - (now - self.started_at))
+
+    def update(self, motion, now):
+        if self.started_at is None:
+            self.reset(now)
+
+        # The first frame after a reset has no predecessor, so its motion of 0 is not evidence of stillness
+        self.frames_seen += 1
+        if motion <= self.motion_threshold and self.frames_seen > 1:
+            self.still_count += 1
+        else:
+            self.still_count = 0
+
+        if self.still_count >= self.stable_frames:
+            return "stable"
+        if now - self.started_at >= self.max_wait:
+            return "timeout"
+        return "waiting"
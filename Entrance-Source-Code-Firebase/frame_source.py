@@ -0,0 +1,170 @@
+import json
+import os
+import queue
+import threading
+import time
+import cv2
+
+DEFAULT_CAMERA = 3  # Index of the gate camera (select another source with CAMERA_SOURCE)
+
+SESSION_INDEX = "frames.jsonl"  # One {"file": ..., "t": seconds} line per recorded frame
+FRAME_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class WebcamSource:
+    """Live camera frames, timestamped with time.monotonic()."""
+    live = True
+
+    def __init__(self, index=DEFAULT_CAMERA, width=1280, height=720):
+        self.cap = cv2.VideoCapture(index)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+    def read(self):
+        """Return (BGR frame, timestamp in seconds), or (None, None) if no frame could be read."""
+        ret, frame = self.cap.read()
+        if not ret:
+            return None, None
+        return frame, time.monotonic()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource:
+    """Frames of a video file, timestamped from the frame rate (the file's own clock, not the wall clock)."""
+    live = False
+
+    def __init__(self, path):
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise ValueError(f"Could not open video file {path}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._index = 0
+
+    def read(self):
+        """Return (BGR frame, timestamp in seconds), or (None, None) at the end of the file."""
+        ret, frame = self.cap.read()
+        if not ret:
+            return None, None
+        timestamp = self._index / self.fps
+        self._index += 1
+        return frame, timestamp
+
+    def release(self):
+        self.cap.release()
+
+
+class FolderSource:
+    """
+    Frames stored as images in a directory, such as a session written by SessionRecorder.
+
+    The recorded timestamps are used when the directory has a SESSION_INDEX;
+    otherwise the images are played in name order at `fps`.
+    """
+    live = False
+
+    def __init__(self, directory, fps=30.0):
+        index_path = os.path.join(directory, SESSION_INDEX)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as fh:
+                entries = [json.loads(line) for line in fh if line.strip()]
+            self._frames = [(os.path.join(directory, entry["file"]), entry["t"]) for entry in entries]
+        else:
+            names = sorted(name for name in os.listdir(directory) if name.lower().endswith(FRAME_EXTENSIONS))
+            self._frames = [(os.path.join(directory, name), i / fps) for i, name in enumerate(names)]
+        if not self._frames:
+            raise ValueError(f"No frames found in {directory}")
+        self._index = 0
+
+    def read(self):
+        """Return (BGR frame, timestamp in seconds), or (None, None) after the last frame."""
+        while self._index < len(self._frames):
+            path, timestamp = self._frames[self._index]
+            self._index += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return frame, timestamp
+            print(f"Skipping unreadable frame {path}")
+        return None, None
+
+    def release(self):
+        pass
+
+
+def open_source(spec):
+    """
+    Open a frame source from a camera index ("3"), a video file or a directory of frames.
+
+    Raises ValueError if a file or directory cannot be read.
+    """
+    spec = str(spec)
+    if spec.isdigit():
+        return WebcamSource(int(spec))
+    if os.path.isdir(spec):
+        return FolderSource(spec)
+    return VideoFileSource(spec)
+
+
+class SessionRecorder:
+    """
+    Saves every frame of a gate session with its timestamp, for replay with FolderSource.
+
+    Frames are written as JPEG on a background thread so recording never
+    slows the camera loop; when the writer falls behind, frames are dropped
+    (and left out of the index) rather than blocking the caller. Timestamps
+    are stored relative to the first recorded frame.
+    """
+
+    def __init__(self, directory, quality=95, max_pending=64):
+        self.directory = directory
+        self.quality = quality
+        self.dropped = 0
+        self._count = 0
+        self._start = None
+        os.makedirs(directory, exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def for_new_session(cls, root, **kwargs):
+        """A recorder writing to a new timestamped directory under `root`."""
+        return cls(os.path.join(root, time.strftime("%Y%m%d-%H%M%S")), **kwargs)
+
+    def record(self, frame, timestamp):
+        """
+        Queue a frame taken at `timestamp` (seconds, any clock) for writing. The frame is
+        copied, since the caller goes on to draw on it (the guide box) before it is written.
+        """
+        if self._start is None:
+            self._start = timestamp
+        self._count += 1
+        name = f"frame_{self._count:06d}.jpg"
+        try:
+            self._queue.put_nowait((name, timestamp - self._start, frame.copy()))
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(os.path.join(self.directory, SESSION_INDEX), "a", encoding="utf-8") as index:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                name, timestamp, frame = item
+                try:
+                    if cv2.imwrite(os.path.join(self.directory, name), frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality]):
+                        index.write(json.dumps({"file": name, "t": round(timestamp, 4)}) + "\n")
+                        index.flush()
+                    else:
+                        print(f"Failed to record frame {name}")
+                except Exception as e:
+                    print(f"Error recording frame: {e}")
+
+    def close(self):
+        """Flush pending frames and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        if self.dropped:
+            print(f"Session recorder dropped {self.dropped} frame(s) it could not write in time")
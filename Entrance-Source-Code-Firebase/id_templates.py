@@ -0,0 +1,477 @@
+import re
+import numpy as np
+from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process  # Installed with thefuzz, which runs on it
+from thefuzz import fuzz
+from id_validators import NumberFormat
+
+# Country header printed on every card; removed before ID type detection
+COUNTRY_HEADER = re.compile(
+    r"\b(REPUBLIC OF THE PHILIPPINES|REPUBLIKA NG PILIPINAS|Republic of the Philippines|Republika ng Pilipinas)\b",
+    re.IGNORECASE,
+)
+
+NAME_FIELDS = ("given", "middle", "last")  # Order of the parts in an extracted name
+
+# Minimum similarity for removing a misread label from a name; shorter labels need more (see unwanted_cutoff)
+UNWANTED_SIMILARITY = 80
+# Letters a word must keep to lose a label glued onto it ("CRUZAddress"); fewer and it is likely
+# a name that starts or ends like a label ("MALENA" is not "MALE" + "NA")
+GLUED_REMAINDER_MIN = 3
+
+
+NOT_LETTERS = re.compile(r"[^A-Z ]")
+
+
+def letters(text):
+    """
+    The letters of `text`, uppercased: how labels and keywords are compared when OCR
+    varies their spacing and punctuation ("Date ofBirth" and "DATE OF BIRTH" are "DATEOFBIRTH").
+    """
+    return re.sub(r"[^A-Z]", "", text.upper())
+
+
+def unwanted_cutoff(length, threshold=UNWANTED_SIMILARITY):
+    """Similarity a run of words needs to be removed as an unwanted phrase of `length` letters."""
+    if length <= 4:
+        return 100  # "SEX", "MALE", "PRN": a name is easily one letter away from them
+    if length <= 7:
+        return max(threshold, 90)  # "WEIGHT" must not take "WRIGHT"
+    return threshold
+
+
+class UnwantedWords:
+    """
+    Labels and headers to remove from an extracted name, compiled once.
+
+    The name is split into words and every run of up to as many words as the
+    longest phrase is compared, by its letters only ("Date ofBirth" reads
+    "DATEOFBIRTH"), with every phrase in one rapidfuzz cdist call. The runs
+    that are similar enough are dropped, best match first, and the name is
+    rebuilt once from the words left. A label OCR glued onto a name word
+    ("CRUZAddress") is cut from the start or end of the word when those
+    letters match it with the same cutoff.
+    """
+
+    def __init__(self, words, threshold=UNWANTED_SIMILARITY):
+        self.words = tuple(words)
+        self.vocabulary = [letters(word) for word in self.words]
+        self.cutoffs = np.array([unwanted_cutoff(len(phrase), threshold) for phrase in self.vocabulary])
+        self.longest = max((len(word.split()) for word in self.words), default=0)
+        self.min_cutoff = float(self.cutoffs.min()) if self.words else 100.0
+        self.lengths = np.array([len(phrase) for phrase in self.vocabulary])
+        self.end_lengths = sorted({length + offset for length in self.lengths.tolist() for offset in (-1, 0, 1)})
+
+    def remove(self, text):
+        """`text` without the unwanted phrases, its words separated by single spaces."""
+        tokens = text.split()
+        if not tokens or not self.words:
+            return " ".join(tokens)
+        tokens = self.drop_runs(tokens)
+        # Cutting a glued label can leave another one ("SEXAddress"), so repeat until nothing is cut
+        while True:
+            stripped = self.strip_glued(tokens)
+            if stripped is tokens:
+                return " ".join(tokens)
+            tokens = self.drop_runs(stripped)
+
+    def drop_runs(self, tokens):
+        """`tokens` without the runs of words that match an unwanted phrase."""
+        # The letters of each word, from one pass over the text; runs of `size` words extend those of size - 1
+        token_letters = NOT_LETTERS.sub("", " ".join(tokens).upper()).split(" ")
+        runs, starts = [token_letters], [0]
+        for size in range(2, min(self.longest, len(tokens)) + 1):
+            runs.append([run + word for run, word in zip(runs[-1], token_letters[size - 1:])])
+            starts.append(starts[-1] + len(runs[-2]))
+
+        scores = rapid_process.cdist([run for sized in runs for run in sized], self.vocabulary,
+                                     scorer=rapid_fuzz.ratio, score_cutoff=self.min_cutoff)
+        if not scores.any():  # A clean name, the usual case
+            return tokens
+        best = np.where(scores >= self.cutoffs, scores, 0).max(axis=1)
+
+        # Best matches first, longer runs first among equals ("GIVEN NAME" over "NAME")
+        indices = np.flatnonzero(best)
+        if not indices.size:
+            return tokens
+        sizes = np.searchsorted(starts, indices, side="right")
+        firsts = indices - np.asarray(starts)[sizes - 1]
+        order = np.lexsort((firsts, -sizes, -best[indices]))
+        removed = [False] * len(tokens)
+        for start, size in zip(firsts[order].tolist(), sizes[order].tolist()):
+            if not any(removed[start:start + size]):
+                removed[start:start + size] = [True] * size
+        return [token for token, drop in zip(tokens, removed) if not drop]
+
+    def strip_glued(self, tokens):
+        """
+        `tokens` with an unwanted phrase cut from the start or end of a word, the best match
+        per word. The ends compared are as long as a phrase or one letter off, as OCR drops
+        and adds letters ("CRUZADDRES").
+        """
+        words = NOT_LETTERS.sub("", " ".join(tokens).upper()).split(" ")
+        ends = [(index, length, from_start) for index, word in enumerate(words) for length in self.end_lengths
+                if len(word) - length >= GLUED_REMAINDER_MIN for from_start in (True, False)]
+        if not ends:
+            return tokens
+        scores = rapid_process.cdist([words[index][:length] if from_start else words[index][-length:]
+                                      for index, length, from_start in ends],
+                                     self.vocabulary, scorer=rapid_fuzz.ratio, score_cutoff=self.min_cutoff)
+        if not scores.any():
+            return tokens
+        lengths = np.array([length for _, length, _ in ends])
+        best = np.where((scores >= self.cutoffs) & (abs(lengths[:, None] - self.lengths) <= 1), scores, 0).max(axis=1)
+        cuts = {}  # Word index -> (score, letters cut, cut from the start)
+        for end in np.flatnonzero(best).tolist():
+            index, length, from_start = ends[end]
+            if best[end] > cuts.get(index, (0,))[0]:
+                cuts[index] = (best[end], length, from_start)
+        if not cuts:
+            return tokens
+
+        stripped = list(tokens)
+        for index, (_, length, from_start) in cuts.items():
+            token = tokens[index]
+            positions = [i for i, char in enumerate(token.upper()) if "A" <= char <= "Z"]
+            stripped[index] = token[positions[length]:] if from_start else token[:positions[-length - 1] + 1]
+        return stripped
+
+
+def normalize_ocr_spaces(text):
+    """ Insert missing spaces between headers and names. """
+    fixed_text = re.sub(r"(SURNAME|SORNAME|GIVENNAME|MIDDLENAME)",
+                        r" \1 ", text.upper())  # Ensure consistent case
+    fixed_text = re.sub(r'\s+', ' ', fixed_text).strip()  # Normalize multiple spaces
+    return fixed_text
+
+
+def clean_name_part(text):
+    """
+    Keep the letters, spaces and hyphens of an OCR'd name (uppercased) and drop stray single
+    letters (like "K"). Any other character separates words ("JUAN.SANTOS"), except an
+    apostrophe, which is part of the name ("O'BRIEN" reads "OBRIEN").
+    """
+    if not text:
+        return ""
+    text = re.sub(r'[^A-Z\s-]', ' ', text.upper().replace("'", ""))  # Non-alphabetic chars split words
+    text = re.sub(r'\b[A-Z]\b', '', text)  # Remove stray single-letter words
+    return re.sub(r'\s+', ' ', text).strip()  # Normalize spaces
+
+
+def last_first(value):
+    """Reorder a "LAST, FIRST" (or "LAST. FIRST") value to "FIRST LAST"; other values are returned as they are."""
+    if ',' in value or '.' in value:
+        parts = re.split(r'[,\.]', value)
+        return f"{parts[1].strip()} {parts[0].strip()}"
+    return value
+
+
+class IDTemplate:
+    """
+    Everything the pipeline needs to know about one ID card type, compiled once.
+
+    `keywords` are (phrase, weight) pairs that identify the card in the OCR
+    text (see rank_id_types); `number` is the ID number regex and
+    `number_shapes` how the number is printed, for checking reads (see
+    id_validators.NumberFormat). `name_patterns` are regexes whose named
+    groups "given", "middle" and "last" (or "name" for the whole name as
+    printed) capture the visitor's name; `name_flags` are their flags. `normalise` is applied to the text before the name patterns,
+    `name_value` to a whole-name capture, and `clean_name` says whether each
+    part goes through clean_name_part. `unwanted` are words (labels and
+    headers) removed from the name.
+    """
+
+    def __init__(self, id_type, keywords, number=None, number_shapes=(), name_patterns=(), name_flags=0,
+                 unwanted=(), normalise=None, name_value=None, clean_name=False):
+        self.id_type = id_type
+        self.keywords = keywords
+        self.number = re.compile(number) if number else None
+        self.number_format = NumberFormat(number_shapes) if number_shapes else None
+        self.name_patterns = [re.compile(pattern, name_flags) for pattern in name_patterns]
+        self.unwanted = UnwantedWords(unwanted)
+        self.normalise = normalise
+        self.name_value = name_value
+        self.clean_name = clean_name
+
+    def find_number(self, text):
+        """The first ID number in `text` (unmasked), or None."""
+        if self.number is None:
+            return None
+        match = self.number.search(text)
+        return match.group(0) if match else None
+
+    def read_number(self, text):
+        """
+        The ID number in `text` (unmasked) with its look-alike characters corrected, and whether
+        it fits the card's format: (number, valid), or (None, False) if there is none.
+        """
+        if self.number_format is None:
+            number = self.find_number(text)
+            return number, number is not None
+        # The first hit may be something else that fits the regex (a 7-letter name on a PRC ID)
+        first = None
+        for match in self.number.finditer(text):
+            number, valid = self.number_format.validate(match.group(0))
+            if valid:
+                return number, True
+            first = first or match.group(0)
+        # The number regex misses a read with a letter where a digit belongs
+        number = self.number_format.search(text)
+        if number is not None:
+            return number, True
+        return first, False
+
+    def find_name(self, text):
+        """The visitor's name in `text` ("GIVEN MIDDLE LAST"), or None."""
+        if not self.name_patterns:
+            return None
+        # The name patterns bound every repetition of letters and words but not of blanks
+        # (" *" and the like): one blank between words keeps each attempt short on any text
+        text = " ".join(text.split())
+        if self.normalise:
+            text = self.normalise(text)
+
+        parts = {}
+        for pattern in self.name_patterns:
+            match = pattern.search(text)
+            if match:
+                parts.update((field, value) for field, value in match.groupdict().items() if value is not None)
+        if not parts:
+            return None
+
+        clean = clean_name_part if self.clean_name else (lambda part: part)
+        if "name" in parts:
+            value = parts["name"].strip()
+            name = clean(self.name_value(value) if self.name_value else value)
+        else:
+            name = " ".join(clean(parts.get(field, "")) for field in NAME_FIELDS).strip()
+        return self.unwanted.remove(name) or None
+
+
+# One template per supported card. Keywords printed only on that card weigh 3,
+# generic ones ("POSTAL", "Health") and field labels 1, so a stray generic word
+# cannot outvote the card's own header; ties go to the type listed first.
+ID_TEMPLATES = {template.id_type: template for template in (
+    IDTemplate(
+        "Philippine National ID",
+        keywords=(
+            ("PAMBANSANG PAGKAKAKILANLAN", 3),
+            ("Philippine Identification Card", 3),
+            ("Mga Pangalan", 1),
+            ("Gitnang Apelyido", 1),
+        ),
+        number=r"\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b",  # 1234-5678-9101-1213 or 1234567891011213
+        number_shapes=("9999-9999-9999-9999",),
+        name_patterns=(
+            r"""
+            (?:Ap\w{0,6}?yido\s*[/\\.\-]?\s*Last[\.\s]*Name\w{0,8})  # "LastName" is often read without the space
+            \s*(?P<last>[A-Z]{1,40}(?:[\s\-][A-Z]{1,40}){0,5})
+            (?=\s*(?:Mga\s+Pangalan|tga\s+Pargalan|Mga|Mea|Mea\s+Pangalan|Given\s+Names|$))
+            """,
+            r"""
+            (?:Mga\s*Pangalan\s*[/\\]?\s*Given['\s]*Name['\s]?\w{0,8})
+            \s*(?P<given>[A-Z]{1,40}(?:[\s\-][A-Z]{1,40}){0,5})
+            (?=\s*(?:Gitnang['\s-]?Apelyido|[G]?itnang|Gitnang['\s-]?|Midd?l?e\s+Name|$))
+            """,
+            r"""
+            (?:Gitnang['\s-]*Ap?e?lyi?do\s*[/\\]?\s*Midd?l?e\s*Name\w{0,8})  # Flexible header
+            \s*(?P<middle>[A-Z]{1,40}(?:[\s\-][A-Z]{1,40}){0,5})
+            (?=\s*(?:[PR]?etsa|[PR]?etsa\s*ng\s*Kapanganakan|Date\s+of\s+Birth|$))  # Stop before the birth date
+            """,
+        ),
+        name_flags=re.X | re.I,
+        clean_name=True,
+        unwanted=("Petsang Kapanganakan", "Date of Birth", "Tirahan", "Address", "Philippine Identification Card",
+                  "PAMBANSANG PAGKAKAKILANLAN"),
+    ),
+    IDTemplate(
+        "Driver's License",
+        keywords=(
+            ("NON-PROFESSIONAL DRIVER'S LICENSE", 3),
+            ("PROFESSIONAL DRIVER'S LICENSE", 3),
+            ("DRIVER'S LICENSE", 3),
+            ("LAND TRANSPORTATION OFFICE", 3),
+            ("DEPARTMENT OF TRANSPORTATION", 2),
+            ("License No", 1),
+            ("Agency Code", 1),
+        ),
+        number=r"\b(?:[A-Z0-9]{2,3}-[A-Z0-9]{2}-[A-Z0-9]{6}|[A-Z0-9]{2,3}-?[0-9]{2,4}-?[0-9]{6})\b",
+        number_shapes=("A99-99-999999",),  # N01-23-456789: office letter and code, year, serial
+        name_patterns=(
+            r"(?:Last|Lest|Lust|Last\s*Nane)\s*Name\s*[,\.\-]?\s*"
+            r"(?:First|Frst|Fist|First\s*Nane)\s*Name\s*[,\.\-]?\s*"
+            r"(?:Middle|Midle|Middie|Middle\s*Nane)\s*Name\s*"
+            # The last name ends with its word, or one long word could be split into three names in L^3 ways
+            r"(?P<last>[A-Z]{1,40})\b\s*[,\.\-]?\s*(?P<given>[A-Z]{1,40}(?:\s+[A-Z]{1,40}){0,5})\s*(?P<middle>[A-Z]{0,40})\s*"
+            r"(?=Nationality|Nationallty|Noticnalty|Date\s*of\s*Birth|Weight|Height|Sex|$)",
+        ),
+        name_flags=re.I,
+        unwanted=("Nationality", "Nationallty", "Noticnalty", "Date of Birth", "Weight", "Height", "Sex", "Address",
+                  "License No", "Expiration Date", "Agency Code", "Blood Type", "Eyes Color", "Restrictions",
+                  "Conditions"),
+    ),
+    IDTemplate(
+        "Postal ID",
+        keywords=(
+            ("POSTAL IDENTITY CARD", 3),
+            ("Philippine Postal Corporation", 3),
+            ("PHLPOST", 2),
+            ("POSTAL", 1),
+            ("PRN", 1),
+        ),
+        number=r"PRN\s*[A-Z0-9]*\s*\d{11,12}[A-Z]?\b",  # PRN E20220548293 or PRN 100141234567P
+        number_shapes=("PRN 999999999999A", "PRN A99999999999"),
+        name_patterns=(
+            r"(?:\w?\sIDENTITY\s*CARD\s*?|\w?\s?CARD\s*?|\w?\s?Suffix)\s*(?P<name>[\w\s]{1,80}?)(?=\s\d{2,}|\sPRN|\sPOSTAL|$)",
+        ),
+        name_flags=re.I,
+        unwanted=("Philippine Postal Corporation", "POSTAL IDENTITY CARD", "PHILPOSTS", "Address", "PRN", "FINL",
+                  "PREMIUM"),
+    ),
+    IDTemplate(
+        "Unified Multi-Purpose ID/SSS ID",
+        keywords=(
+            ("Unified Multi-Purpose ID", 3),
+            ("CRN", 2),
+        ),
+        # XYZ-0028-1215160-9 or ABC 1234 1234567 D
+        number=r"\b[A-Z0-9]{3}[-\s]?[A-Z0-9]{4}[-\s]?[A-Z0-9]{7}[-\s]?[A-Z0-9]{1}\b",
+        number_shapes=("CRN-9999-9999999-9",),
+        name_patterns=(
+            r"""
+            \b(?:SURNAME|SORNAME)\b\s*  # Handle OCR errors
+            (?P<last>[A-Z]{1,40}(?:\s[A-Z]{1,40}){0,5})
+            (?=\s*(?:GIVEN\s*NAME|GIVENNAME))  # Ensure "GIVEN NAME" follows
+            """,
+            r"""
+            \b(?:GIVEN\s*NAME|GIVENNAME)\b\s*  # Handle OCR errors
+            (?P<given>[A-Z]{1,40}(?:\s[A-Z]{1,40}){0,5})
+            (?=\s*(?:MIDDLE\s*NAME|MIDDLENAME|MIDOLE\s*NAME|MIDDLE[\-\.\,]NAME))  # Ensure "MIDDLE NAME" follows
+            """,
+            r"""
+            \b(?:MIDDLE\s*NAME|MIDDLENAME|MIDOLE\s*NAME|MIDDLE[,\.\-]NAME)\b\s*  # Handle OCR errors
+            (?P<middle>[A-Z]{1,40}(?:[\s\-][A-Z]{1,40}){0,5})
+            (?=\s*(?:SEX|ADORESS|ADDRESS|\n|$))  # Ensure "SEX" or end of line follows
+            """,
+        ),
+        name_flags=re.X | re.I,
+        normalise=normalize_ocr_spaces,
+        clean_name=True,
+        unwanted=("Unified Multi-Purpose ID", "CRN", "DATE OF BIRTH", "ADDRESS", "FEMALE", "MALE", "SEX", "SURNAME",
+                  "GIVEN NAME", "GIVENNAME", "MIDDLE NAME", "NAME"),
+    ),
+    IDTemplate(
+        "PRC ID",
+        keywords=(
+            ("PROFESSIONAL IDENTIFICATION CARD", 3),
+            ("PROFESSIONAL REGULATION COMMISSION", 3),
+            ("Registration No", 1),
+        ),
+        number=r"\b[A-Z0-9]{7}\b",  # 0012345 or ABC1234
+        number_shapes=("9999999",),  # Registration numbers are printed as 7 digits
+        name_patterns=(
+            r"(?:\w?\s?LAST\w?\s?NAME)\s*(?P<last>[\w\s]{1,80}?)\s*(?:FIRST\w?\s?NAME\w?\s?|$)",
+            r"(?:\w?\s?FIRST\w?\s?NAME)\s*(?P<given>[\w\s]{1,80}?)\s*(?:MIDDLE\w?\s?NAME\w?\s?|$)",
+            r"(?:\w?\s?MIDDLE\w?\s?NAME)\s*(?P<middle>[\w\s]{1,80}?)\s*(?:REGISTRATION\w?\s?|$)",
+        ),
+        name_flags=re.I,
+        normalise=normalize_ocr_spaces,
+        clean_name=True,
+        unwanted=("PROFESSIONAL REGULATION COMMISSION", "PROFESSIONAL IDENTIFICATION CARD", "REGISTRATION NO",
+                  "REGISTRATION DATE", "VALID UNTIL", "OCCUPATIONAL THERAPY TECHNICIAN"),
+    ),
+    IDTemplate(
+        "PhilHealth ID",
+        keywords=(
+            ("Philippine Health Insurance Corporation", 3),
+            ("PhilHealth", 2),
+            ("Health", 1),
+        ),
+        number=r"\b\d{2}[-\s]?\d{8}[-\s]?\d{1}\b",  # 12-34567891-2
+        number_shapes=("99-99999999-9",),
+        # The name follows the number and precedes the birth date, printed "LAST, FIRST MIDDLE"
+        name_patterns=(
+            r"(?:\d{2}-\d{8}-\d{1})\s*(?P<name>[\w\s,]{1,80}?)(?=\s*(?:\w?\s?JANUARY|FEBRUARY|MARCH|APRIL|MAY|JUNE|JULY"
+            r"|AUGUST|SEPTEMBER|OCTOBER|NOVEMBER|DECEMBER|$))",
+        ),
+        name_value=last_first,
+        clean_name=True,
+        unwanted=("Philippine Health Insurance Corporation", "SignUnre", "FORMAL ECONOMY", "MALE", "FEMALE",
+                  "Date of Birth"),
+    ),
+)}
+
+
+def keyword_pattern(phrase):
+    """Lowercase regex for a keyword phrase; OCR often drops the spaces between its words."""
+    pattern = r"\s*".join(re.escape(word) for word in phrase.lower().split())
+    # Short keywords ("CRN", "PRN") only count as words of their own
+    return rf"\b{pattern}\b" if len(phrase) <= 4 else pattern
+
+
+# Every keyword of every type in one alternation, longest first so a phrase wins
+# over the shorter keywords it contains ("POSTAL IDENTITY CARD" over "POSTAL").
+# A hit is told apart by its letters: named groups would keep `re` from skipping
+# ahead to the characters a keyword can start with, which makes the scan 5x slower.
+KEYWORDS = sorted(((template.id_type, phrase, weight) for template in ID_TEMPLATES.values()
+                   for phrase, weight in template.keywords), key=lambda keyword: -len(keyword[1]))
+KEYWORD_MATCHER = re.compile("|".join(keyword_pattern(phrase) for _, phrase, _ in KEYWORDS))
+KEYWORD_LETTERS = [letters(phrase) for _, phrase, _ in KEYWORDS]
+KEYWORD_INDEX = {phrase_letters: i for i, phrase_letters in enumerate(KEYWORD_LETTERS)}  # No two keywords share their letters
+
+# Phrases long enough to be told apart also count when OCR misreads a letter or two
+FUZZY_KEYWORD_LETTERS = 12
+KEYWORD_SIMILARITY = 85  # Minimum partial_ratio against the letters of the text
+
+
+def rank_id_types(text):
+    """
+    Score every ID type by the keywords in `text`, best first: a list of
+    (id_type, score) for the types with at least one keyword.
+
+    Each keyword counts once, with its weight; a long keyword that is not in
+    the text verbatim counts with its weight scaled by its fuzzy similarity.
+    The gap between the first two scores says how sure the ranking is.
+    """
+    lowered = COUNTRY_HEADER.sub("", text).lower()
+    found, rest = set(), []
+    position = 0
+    for match in KEYWORD_MATCHER.finditer(lowered):
+        i = KEYWORD_INDEX[letters(match.group())]
+        found.add(i)
+        if len(KEYWORD_LETTERS[i]) >= FUZZY_KEYWORD_LETTERS:
+            # Left out of the fuzzy pass, so the phrases inside a header are not counted again
+            rest.append(lowered[position:match.start()])
+            position = match.end()
+    rest.append(lowered[position:])
+
+    scores = {}
+    text_letters = None
+    for i, (id_type, phrase, weight) in enumerate(KEYWORDS):
+        if i not in found:
+            phrase_letters = KEYWORD_LETTERS[i]
+            if len(phrase_letters) < FUZZY_KEYWORD_LETTERS:
+                continue
+            if text_letters is None:
+                text_letters = letters(" ".join(rest))
+            # partial_ratio scores the shorter string inside the longer: a word that is only part of the phrase is no hit
+            if 100 * len(text_letters) < KEYWORD_SIMILARITY * len(phrase_letters):
+                continue
+            similarity = fuzz.partial_ratio(phrase_letters, text_letters)
+            if similarity < KEYWORD_SIMILARITY:
+                continue
+            weight = weight * similarity / 100
+        scores[id_type] = scores.get(id_type, 0) + weight
+
+    order = list(ID_TEMPLATES)
+    return sorted(scores.items(), key=lambda item: (-item[1], order.index(item[0])))
+
+
+def keyword_types(text):
+    """The ID types with a keyword in `text` as printed (no fuzzy matching, no scores)."""
+    return {KEYWORDS[KEYWORD_INDEX[letters(match.group())]][0] for match in KEYWORD_MATCHER.finditer(text.lower())}
+
+
+def find_id_type(text):
+    """The best-scoring ID type for `text` (see rank_id_types), or None."""
+    ranking = rank_id_types(text)
+    return ranking[0][0] if ranking else None
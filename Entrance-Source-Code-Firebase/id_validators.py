@@ -0,0 +1,98 @@
+import re
+
+# Characters OCR confuses between digits and letters, read as the kind of character a position needs
+DIGIT_LOOKALIKES = {"O": "0", "Q": "0", "D": "0", "U": "0", "I": "1", "L": "1", "J": "1", "Z": "2", "A": "4",
+                    "S": "5", "G": "6", "T": "7", "B": "8"}
+LETTER_LOOKALIKES = {"0": "O", "1": "I", "2": "Z", "4": "A", "5": "S", "6": "G", "7": "T", "8": "B"}
+
+# A read needing more corrections than this is more likely something else than a misread number
+MAX_CORRECTIONS = 2
+
+SEPARATORS = re.compile(r"[-\s]+")
+
+
+class NumberFormat:
+    """
+    The printed structure of an ID number, for checking a read before it is masked.
+
+    Each shape spells out one way the number is printed: "9" is a digit, "A"
+    a letter, "-" or " " a separator (printed or not) and any other character
+    itself ("CRN", "PRN"). A read fits a shape when it has the same characters
+    once look-alikes are read as the kind each position needs (an "O" where a
+    digit belongs is a 0, a "0" in "CRN" an O), at most MAX_CORRECTIONS of them, and, if it was
+    read with all of its separators, the same segment lengths. None of the
+    supported cards publishes a check digit, so the structure is all there is
+    to check.
+    """
+
+    def __init__(self, shapes):
+        self.shapes = [shape.upper() for shape in shapes]
+        self.compact = [SEPARATORS.sub("", shape) for shape in self.shapes]
+        self.segments = [[len(segment) for segment in SEPARATORS.split(shape)] for shape in self.shapes]
+        # Finds reads the card's number regex misses because OCR took a digit for a letter
+        self.loose = re.compile("|".join(f"(?:{self.loose_pattern(shape)})" for shape in self.shapes), re.I)
+
+    @staticmethod
+    def loose_pattern(shape):
+        """Regex for reads of `shape` with look-alikes in any position."""
+        parts = []
+        for char in shape:
+            if char == "9":
+                parts.append("[0-9" + "".join(DIGIT_LOOKALIKES) + "]")
+            elif char == "A":
+                parts.append("[A-Z]")
+            elif char in "- ":
+                parts.append(r"[-\s]?")
+            else:
+                lookalikes = "".join(digit for digit, letter in LETTER_LOOKALIKES.items() if letter == char)
+                parts.append(f"[{re.escape(char)}{lookalikes}]")
+        return r"(?<![A-Z0-9])" + "".join(parts) + r"(?![A-Z0-9])"
+
+    def correct(self, compact, shape):
+        """`compact` read as `shape`: (corrected characters, corrections), or (None, 0) if it does not fit."""
+        if len(compact) != len(shape):
+            return None, 0
+        chars, corrections = [], 0
+        for char, kind in zip(compact, shape):
+            if kind == "9":
+                fixed = char if char.isdigit() else DIGIT_LOOKALIKES.get(char)
+            elif kind == "A":
+                # Not corrected: a digit here is as likely a real digit shifted by a dropped letter
+                fixed = char if char.isalpha() else None
+            else:
+                fixed = char if char == kind else (kind if LETTER_LOOKALIKES.get(char) == kind else None)
+            if fixed is None:
+                return None, 0
+            corrections += fixed != char
+            chars.append(fixed)
+        return chars, corrections
+
+    def validate(self, number):
+        """
+        Check an unmasked `number` against the shapes. Returns (number, valid): the read with its
+        look-alikes corrected and its separators as read if it fits a shape, else the read unchanged.
+        """
+        read = number.strip().upper()
+        compact = SEPARATORS.sub("", read)
+        segments = [len(segment) for segment in SEPARATORS.split(read)]
+        best = None
+        for shape, shape_segments in zip(self.compact, self.segments):
+            # A separator OCR dropped is fine; one in the wrong place is not
+            if len(segments) == len(shape_segments) and segments != shape_segments:
+                continue
+            chars, corrections = self.correct(compact, shape)
+            if chars is not None and corrections <= MAX_CORRECTIONS and (best is None or corrections < best[1]):
+                best = chars, corrections
+        if best is None:
+            return number, False
+
+        fixed = iter(best[0])
+        return "".join(next(fixed) if char.isalnum() else char for char in read), True
+
+    def search(self, text):
+        """The first read in `text` that fits a shape once corrected, or None."""
+        for match in self.loose.finditer(text):
+            number, valid = self.validate(match.group(0))
+            if valid:
+                return number
+        return None
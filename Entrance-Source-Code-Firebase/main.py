@@ -1,22 +1,24 @@
 import os
 import sys
+import time
 import cv2
-import uuid
-import numpy as np
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QStackedWidget
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QPushButton, QVBoxLayout, QWidget, QStackedWidget, QProgressBar
 from PyQt5.QtGui import QPixmap, QImage, QFont
-from PyQt5.QtCore import QTimer, Qt
-from ocr_utils import insert_vehicle_entry, detect_id_type, extract_registration_number, extract_name, generate_qr_code, ocr, process_image_with_ocr
-import firebase_admin
-from firebase_admin import credentials
-import firebase_admin
-from firebase_admin import credentials, db
-from receipt_printer import WindowsPrinter
+from PyQt5.QtCore import QTimer, Qt, QThread, pyqtSignal
+from ocr_utils import guide_box, get_ocr, warm_up
+from ocr_worker import OCRJobExecutor
+from capture_writer import CaptureWriter
+from frame_source import DEFAULT_CAMERA, SessionRecorder, open_source
+from scan_flow import ScanFlow
+from ocr_timing import timing_stats
 
 # Initialize Firebase with proper path handling
 def initialize_firebase():
     try:
+        # Imported here so the window can appear before the Firebase SDK has loaded
+        import firebase_admin
+        from firebase_admin import credentials
+
         # Get the directory where this script is located
         script_dir = os.path.dirname(os.path.abspath(__file__))
         # Construct the full path to the credentials file
@@ -37,10 +39,44 @@ def initialize_firebase():
         print(f"Error initializing Firebase: {e}")
         return False
 
-# Initialize Firebase at application start
-if not initialize_firebase():
-    print("Failed to initialize Firebase. Exiting...")
-    sys.exit(1)
+class StartupLoader(QThread):
+    """Initializes Firebase, loads the OCR model and warms it up in the background."""
+    progress = pyqtSignal(int, str)
+    ready = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, ocr_process=None, ocr_service=None):
+        super().__init__()
+        self.ocr_process = ocr_process  # Load the model in this OCR process instead of the GUI process
+        self.ocr_service = ocr_service  # Or use the shared OCR service, loading no model here if it is up
+
+    def run(self):
+        start = time.perf_counter()
+        self.progress.emit(0, "Connecting to Firebase...")
+        if not initialize_firebase():
+            self.failed.emit("Failed to initialize Firebase.")
+            return
+
+        self.progress.emit(1, "Loading OCR model...")
+        try:
+            if self.ocr_service is not None and self.ocr_service.healthy():
+                print(f"Using the OCR service at {self.ocr_service.url}")
+                warm_up_seconds = 0.0
+            elif self.ocr_process is not None:
+                # The OCR process loads and warms up the model in one go
+                self.ocr_process.start()
+                warm_up_seconds = self.ocr_process.wait_ready()
+            else:
+                get_ocr()
+                self.progress.emit(2, "Warming up OCR model...")
+                warm_up_seconds = warm_up()
+        except Exception as e:
+            self.failed.emit(f"Failed to load OCR model: {e}")
+            return
+
+        print(f"Startup finished in {time.perf_counter() - start:.1f}s (warm-up inference {warm_up_seconds:.2f}s)")
+        self.progress.emit(3, "Ready")
+        self.ready.emit()
 
 class HomeScreen(QMainWindow):
     def __init__(self, stacked_widget):
@@ -63,21 +99,40 @@ class HomeScreen(QMainWindow):
         title_label.setFont(QFont("Arial", 18, QFont.Bold))
         title_label.setAlignment(Qt.AlignCenter)
 
-        # Start button
-        start_button = QPushButton("Start ID Scanning", self)
-        start_button.clicked.connect(self.go_to_scan_screen)
-        start_button.setFixedSize(200, 50)
+        # Start button (enabled once the OCR model is loaded)
+        self.start_button = QPushButton("Start ID Scanning", self)
+        self.start_button.clicked.connect(self.go_to_scan_screen)
+        self.start_button.setFixedSize(200, 50)
+        self.start_button.setEnabled(False)
+
+        # Startup progress
+        self.status_label = QLabel("Starting...", self)
+        self.status_label.setAlignment(Qt.AlignCenter)
+        self.progress_bar = QProgressBar(self)
+        self.progress_bar.setRange(0, 3)
+        self.progress_bar.setFixedWidth(400)
 
         # Layout
         layout = QVBoxLayout()
         layout.addWidget(logo)
         layout.addWidget(title_label)
-        layout.addWidget(start_button, alignment=Qt.AlignCenter)
+        layout.addWidget(self.status_label)
+        layout.addWidget(self.progress_bar, alignment=Qt.AlignCenter)
+        layout.addWidget(self.start_button, alignment=Qt.AlignCenter)
 
         container = QWidget()
         container.setLayout(layout)
         self.setCentralWidget(container)
 
+    def set_progress(self, step, message):
+        self.progress_bar.setValue(step)
+        self.status_label.setText(message)
+
+    def set_ready(self):
+        self.progress_bar.hide()
+        self.status_label.setText("Ready")
+        self.start_button.setEnabled(True)
+
     def go_to_scan_screen(self):
         self.stacked_widget.setCurrentIndex(1)
         self.stacked_widget.currentWidget().start_webcam()  # Start webcam when switching to ScanScreen
@@ -86,13 +141,18 @@ class ScanScreen(QMainWindow):
     def __init__(self, stacked_widget):
         super().__init__()
         self.stacked_widget = stacked_widget
-        self.cap = None  # Webcam capture object
+        self.source = None  # Frame source: the webcam, or a video file / recorded session named by CAMERA_SOURCE
         self.timer = QTimer()  # Timer for updating the webcam feed
-        self.id_detected = False  # Flag to track ID detection
-        self.countdown_timer = QTimer()  # Timer for countdown
-        self.cooldown_timer = QTimer()  # Timer for cooldown after capturing an ID
-        self.countdown_seconds = 5  # 5-second countdown
-        self.cooldown_seconds = 7  # 7-second cooldown
+        self.ocr_executor = OCRJobExecutor()  # Runs OCR off the GUI thread
+        self.ocr_executor.finished.connect(self.on_ocr_finished)
+        self.ocr_executor.failed.connect(self.on_ocr_failed)
+        # Optional asynchronous archive of captured frames (set SAVE_CAPTURES=0 to disable)
+        self.capture_writer = CaptureWriter("captureIDs") if os.environ.get("SAVE_CAPTURES", "1") != "0" else None
+        # Detect -> hold still -> capture -> OCR -> cooldown, independent of the GUI (see replay_sessions.py)
+        self.flow = ScanFlow(self.ocr_executor.submit, burst_size=3, max_wait=5.0, capture_writer=self.capture_writer)
+        # Optional recording of every camera frame for offline replay (RECORD_SESSIONS=<directory>)
+        record_root = os.environ.get("RECORD_SESSIONS")
+        self.recorder = SessionRecorder.for_new_session(record_root) if record_root else None
         self.initUI()
 
     def initUI(self):
@@ -104,7 +164,7 @@ class ScanScreen(QMainWindow):
         self.video_label.setAlignment(Qt.AlignCenter)
 
         # Countdown label
-        self.countdown_label = QLabel("Countdown: 5", self)
+        self.countdown_label = QLabel("Place your ID inside the box", self)
         self.countdown_label.setFont(QFont("Arial", 24, QFont.Bold))
         self.countdown_label.setAlignment(Qt.AlignCenter)
         self.countdown_label.setStyleSheet("color: red;")  # Set text color to red
@@ -126,27 +186,28 @@ class ScanScreen(QMainWindow):
 
     def start_webcam(self):
         """Start the webcam feed."""
-        if self.cap is None:
-            self.cap = cv2.VideoCapture(3)  # Initialize webcam
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        if self.source is None:
+            self.source = open_source(os.environ.get("CAMERA_SOURCE", str(DEFAULT_CAMERA)))
             self.timer.timeout.connect(self.update_frame)
             self.timer.start(20)  # Update every 20ms
 
     def update_frame(self):
         """Update the webcam feed and perform automatic ID detection."""
-        if self.cap is not None:
-            ret, frame = self.cap.read()
-            if ret:
+        if self.source is not None:
+            frame, timestamp = self.source.read()
+            if frame is not None:
+                if self.recorder is not None:
+                    self.recorder.record(frame, timestamp)
+
                 # Convert frame to grayscale for ID detection
                 gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
                 # Draw guiding lines on the frame
                 frame = self.draw_guiding_lines(frame)
 
-                # Perform automatic ID detection (only if not in cooldown)
-                if not self.id_detected and not self.cooldown_timer.isActive():
-                    self.id_detected = self.detect_id(gray_frame)
+                # Automatic ID detection and the stability-triggered capture
+                self.flow.process_frame(gray_frame, time.monotonic(), ocr_busy=self.ocr_executor.busy)
+                self.countdown_label.setText(self.flow.message)
 
                 # Display the frame
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -157,146 +218,68 @@ class ScanScreen(QMainWindow):
 
     def draw_guiding_lines(self, frame):
         """Draw guiding lines on the frame to indicate the ID placement area."""
-        h, w, _ = frame.shape
-        # Draw a rectangle in the center of the frame
-        cv2.rectangle(frame, (w // 4, h // 4), (3 * w // 4, 3 * h // 4), (0, 255, 0), 2)
+        # Draw a rectangle in the center of the frame (the region OCR is restricted to)
+        x1, y1, x2, y2 = guide_box(frame.shape)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
         return frame
 
-    def detect_id(self, gray_frame):
-        """
-        Detect the presence of an ID in the frame using edge detection.
-        Returns True if an ID is detected, otherwise False.
-        """
-        # Apply edge detection
-        edges = cv2.Canny(gray_frame, 100, 200)
-
-        # Count the number of edges (high pixel values)
-        edge_count = np.sum(edges > 0)
-
-        # If the edge count is above a threshold, assume an ID is present
-        if edge_count > 20000:  # Adjust this threshold as needed
-            print("ID detected automatically! Starting countdown...")
-            self.start_countdown()  # Start the 5-second countdown
-            return True
-        return False
-
-    def start_countdown(self):
-        """Start a 5-second countdown before capturing the image."""
-        # Stop the timer if it's already running
-        if self.countdown_timer.isActive():
-            self.countdown_timer.stop()
-
-        # Reset the countdown seconds
-        self.countdown_seconds = 5
-
-        # Disconnect any existing connections to avoid multiple signals
-        try:
-            self.countdown_timer.timeout.disconnect()
-        except TypeError:
-            pass  # No connections to disconnect
-
-        # Connect the timeout signal to the update_countdown method
-        self.countdown_timer.timeout.connect(self.update_countdown)
-
-        # Start the timer
-        self.countdown_timer.start(1000)  # Update every 1 second
-
-    def update_countdown(self):
-        """Update the countdown and capture the image when it reaches 0."""
-        if self.countdown_seconds > 0:
-            print(f"Countdown: {self.countdown_seconds} seconds")
-            self.countdown_label.setText(f"Countdown: {self.countdown_seconds}")  # Update the countdown label
-            self.countdown_seconds -= 1
-        else:
-            self.countdown_timer.stop()
-            self.countdown_label.setText("Countdown: 0")  # Set countdown to 0
-            self.capture_image()  # Capture the image after countdown
-
     def capture_image(self):
-        """Capture an image and process it."""
-        if self.cap is not None:
-            ret, frame = self.cap.read()
-            if ret:
-                gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-                timestamp = uuid.uuid4().hex
-                image_path = f"captureIDs/captured_id_{timestamp}.jpg"
-                cv2.imwrite(image_path, gray_frame)
-
-                # OCR processing only (no DB insert here)
-                extracted_name, id_type, registration_number = process_image_with_ocr(image_path)
-
-                if extracted_name == "Name not found":
-                    print("Name not found, restarting countdown...")
-                    self.start_countdown()
-                    return
-
-                # Generate QR and insert only if name is found
-                qr_code_value = str(uuid.uuid4())
-                qr_code_path = generate_qr_code(qr_code_value)
-                print(f"Generated QR Code: {qr_code_value}")
-                print(f"Saved at: {qr_code_path}")
-
-                entry_id = insert_vehicle_entry(extracted_name, id_type, registration_number, qr_code_value)
-                print(f"Entry inserted with ID: {entry_id}")
-
-                # Print receipt
-                printer = WindowsPrinter()
-                if printer.print_receipt(qr_code_path, extracted_name, id_type, registration_number):
-                    print("Receipt printed successfully")
-                else:
-                    print("Failed to print receipt (but data was saved)")
-
-                # Display QR and image
-                qr_image = cv2.imread(qr_code_path)
-                plt.imshow(cv2.cvtColor(qr_image, cv2.COLOR_BGR2RGB))
-                plt.axis('off')
-                plt.title(f"QR Code for {extracted_name}")
-                plt.show()
-
-                image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                plt.imshow(image, cmap='gray')
-                plt.axis('off')
-                plt.title(f"ID Type: {id_type}\nReg. No: {registration_number}\nName:{extracted_name}")
-                plt.show()
-
-                self.id_detected = False
-                self.start_cooldown()
-
-    def start_cooldown(self):
-        """Start a 7-second cooldown after capturing an ID."""
-        # Stop the timer if it's already running
-        if self.cooldown_timer.isActive():
-            self.cooldown_timer.stop()
-
-        # Reset the cooldown seconds
-        self.cooldown_seconds = 7
-
-        # Disconnect any existing connections to avoid multiple signals
-        try:
-            self.cooldown_timer.timeout.disconnect()
-        except TypeError:
-            pass  # No connections to disconnect
-
-        # Connect the timeout signal to the update_cooldown method
-        self.cooldown_timer.timeout.connect(self.update_cooldown)
-
-        # Start the timer
-        self.cooldown_timer.start(1000)  # Update every 1 second
-
-    def update_cooldown(self):
-        """Update the cooldown and allow ID detection when it reaches 0."""
-        if self.cooldown_seconds > 0:
-            print(f"Cooldown: {self.cooldown_seconds} seconds")
-            self.cooldown_seconds -= 1
-        else:
-            self.cooldown_timer.stop()
-            print("Cooldown finished. Ready to detect another ID.")
+        """Capture an image now (the manual button) and hand the best frames to the OCR worker."""
+        if self.source is not None:
+            if self.ocr_executor.busy:
+                print("OCR already in progress, ignoring capture request.")
+                return
+
+            frame, _ = self.source.read()
+            if frame is not None:
+                self.flow.capture(time.monotonic(), cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                self.countdown_label.setText(self.flow.message)
+
+    def on_ocr_finished(self, result):
+        """Handle an OCR result posted back from the worker thread."""
+        extracted_name = result["name"]
+        id_type = result["id_type"]
+        registration_number = result["id_number"]
+
+        # A retry or a missing name re-arms the stability trigger; an accepted visitor starts the cooldown
+        accepted = self.flow.ocr_finished(result, time.monotonic())
+        self.countdown_label.setText(self.flow.message)
+        if not accepted:
+            return
+
+        # Display QR and image without blocking the event loop, in the same two windows for every
+        # visitor: a new figure per result would leak windows (and their memory) all day
+        import matplotlib.pyplot as plt  # Loaded on first use to keep startup fast
+
+        qr_image = cv2.imread(result["qr_code_path"])
+        plt.figure(num="QR code", clear=True)
+        plt.imshow(cv2.cvtColor(qr_image, cv2.COLOR_BGR2RGB))
+        plt.axis('off')
+        plt.title(f"QR Code for {extracted_name}")
+        plt.show(block=False)
+
+        plt.figure(num="Scanned ID", clear=True)
+        plt.imshow(result["image"], cmap='gray')
+        plt.axis('off')
+        plt.title(f"ID Type: {id_type}\nReg. No: {registration_number}\nName:{extracted_name}")
+        plt.show(block=False)
+
+    def on_ocr_failed(self, message):
+        """Retry after the worker reports an error."""
+        self.flow.ocr_failed(message, time.monotonic())
+        self.countdown_label.setText(self.flow.message)
 
     def closeEvent(self, event):
         """Release the webcam when the window is closed."""
-        if self.cap is not None:
-            self.cap.release()
+        if self.source is not None:
+            self.source.release()
+        if self.recorder is not None:
+            self.recorder.close()
+        self.ocr_executor.shutdown()
+        if self.capture_writer is not None:
+            self.capture_writer.close()
+        if timing_stats.enabled:
+            timing_stats.dump()
         event.accept()
 
 class MainApp(QApplication):
@@ -316,6 +299,17 @@ class MainApp(QApplication):
         self.stacked_widget.setFixedSize(1152, 648)  # Fixed screen size
         self.stacked_widget.show()
 
+        # Firebase and the OCR model load behind the visible home screen
+        self.loader = StartupLoader(self.scan_screen.ocr_executor.ocr_process, self.scan_screen.ocr_executor.ocr_service)
+        self.loader.progress.connect(self.home_screen.set_progress)
+        self.loader.ready.connect(self.home_screen.set_ready)
+        self.loader.failed.connect(self.on_startup_failed)
+        self.loader.start()
+
+    def on_startup_failed(self, message):
+        print(f"{message} Exiting...")
+        self.exit(1)
+
 if __name__ == "__main__":
     app = MainApp(sys.argv)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,240 @@
+import re
+import numpy as np
+from thefuzz import fuzz
+from id_templates import letters
+
+# Labels next to which the name and ID number are printed on the supported cards,
+# as uppercase letters only (spaces and punctuation are dropped before matching)
+FIELD_ANCHORS = (
+    "LASTNAME", "APELYIDO", "MGAPANGALAN", "GIVENNAME", "FIRSTNAME",
+    "GITNANG", "MIDDLENAME", "SURNAME", "PRN", "CRN", "LICENSENO", "REGISTRATIONNO",
+)
+
+# Labels that follow a field; the extraction regexes stop at them, so they are read too (without their values)
+STOP_LABELS = (
+    "PETSANG", "NATIONALITY", "SEX", "REGISTRATIONDATE", "TIRAHAN", "ADDRESS",
+)
+
+HEADER_BAND = 0.3    # Boxes centred in the top 30% of the card hold the ID type keywords
+PREFIX_ASPECT = 4    # Coarse pass reads only the first 4 box-heights of a line (~5-8 characters)
+ANCHOR_SIMILARITY = 80
+
+
+def box_rect(box):
+    """Return the axis-aligned (x0, y0, x1, y1) bounds of a text box quadrilateral."""
+    points = np.asarray(box, dtype=np.float32).reshape(-1, 2)
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+def is_anchor(text, anchors=FIELD_ANCHORS):
+    """True if `text` (possibly just the start of a line) begins like one of the `anchors`."""
+    prefix = letters(text)
+    if len(prefix) < 3:
+        return False
+    for anchor in anchors:
+        n = min(len(prefix), len(anchor))
+        if fuzz.ratio(prefix[:n], anchor[:n]) >= ANCHOR_SIMILARITY:
+            return True
+    return False
+
+
+def is_numberish(text):
+    """True if `text` looks like the start of an ID number (at least half digits, not a date)."""
+    if "/" in text:
+        return False
+    alnum = re.sub(r"[^A-Z0-9]", "", text.upper())
+    return len(alnum) >= 4 and sum(char.isdigit() for char in alnum) * 2 >= len(alnum)
+
+
+def adjacent_boxes(index, rects):
+    """
+    Return the indices of the nearest box to the right of and the nearest box
+    below rects[index], which is where a card prints the value of a label.
+    """
+    x0, y0, x1, y1 = rects[index]
+    height = max(y1 - y0, 1.0)
+    centre_y = (y0 + y1) / 2
+    right, below = None, None
+    right_gap, below_gap = 12 * height, 2.5 * height
+
+    for other, (ox0, oy0, ox1, oy1) in enumerate(rects):
+        if other == index:
+            continue
+        # Same line, starting after the label ends
+        if oy0 <= centre_y <= oy1 and ox0 >= x1 - height and ox0 - x1 < right_gap:
+            right, right_gap = other, ox0 - x1
+        # Next line down, overlapping the label horizontally or starting near it
+        overlaps = ox0 < x1 and ox1 > x0
+        if oy0 > centre_y and (overlaps or abs(ox0 - x0) < 3 * height) and oy0 - y1 < below_gap:
+            below, below_gap = other, oy0 - y1
+
+    return [i for i in (right, below) if i is not None]
+
+
+def header_indices(rects, image_height, band=HEADER_BAND):
+    """Indices of boxes centred in the top `band` of the image."""
+    return {i for i, (_, y0, _, y1) in enumerate(rects) if (y0 + y1) / 2 < band * image_height}
+
+
+def prefix_crop(crop, aspect=PREFIX_ASPECT):
+    """Cut a text line crop to its first `aspect` heights."""
+    return crop[:, :max(1, int(crop.shape[0] * aspect))]
+
+
+def select_field_boxes(rects, prefix_texts):
+    """
+    Choose the boxes worth a full recognition pass from a coarse read.
+
+    `prefix_texts` maps box index to the text read from the start of that box.
+    Anchor labels, number-like boxes and the boxes beside or below them are
+    selected, as are the STOP_LABELS on their own.
+    """
+    selected = set()
+    for index, text in prefix_texts.items():
+        if is_anchor(text) or is_numberish(text):
+            selected.add(index)
+            selected.update(adjacent_boxes(index, rects))
+        elif is_anchor(text, STOP_LABELS):
+            selected.add(index)
+    return selected
+
+
+# Where each field is printed on the card types whose layout is known: aliases of
+# its label (letters only; a label may be read as one box or split in two) and
+# where its value sits relative to the label, tried in order. "same" is the label
+# box itself (the value follows the label in one box, e.g. "PRN 1001...").
+# "full_name" is a driver's licence style "LAST, FIRST MIDDLE" value.
+LAYOUT_FIELDS = {
+    "Philippine National ID": {
+        "last_name": (("APELYIDOLASTNAME", "LASTNAME"), ("below",)),
+        "given_name": (("MGAPANGALANGIVENNAMES", "GIVENNAMES"), ("below",)),
+        "middle_name": (("GITNANGAPELYIDOMIDDLENAME", "MIDDLENAME"), ("below",)),
+    },
+    "Driver's License": {
+        "full_name": (("LASTNAMEFIRSTNAMEMIDDLENAME",), ("below",)),
+        "id_number": (("LICENSENO",), ("below",)),
+    },
+    "Unified Multi-Purpose ID/SSS ID": {
+        "last_name": (("SURNAME",), ("right", "below")),
+        "given_name": (("GIVENNAME",), ("right", "below")),
+        "middle_name": (("MIDDLENAME",), ("right", "below")),
+        "id_number": (("CRN",), ("same",)),
+    },
+    "PRC ID": {
+        "last_name": (("LASTNAME",), ("right",)),
+        "given_name": (("FIRSTNAME",), ("right",)),
+        "middle_name": (("MIDDLENAME",), ("right",)),
+        "id_number": (("REGISTRATIONNO",), ("right", "same")),
+    },
+    "Postal ID": {
+        "id_number": (("PRN",), ("same",)),
+    },
+}
+
+LABEL_SIMILARITY = 80
+VALUE_GAP = 2.0  # Boxes of one value on a line are at most 2 line heights apart
+
+
+def label_score(text, aliases):
+    """Best similarity (0-100) between the start of `text` and one of the label `aliases`."""
+    prefix = letters(text)
+    if len(prefix) < 3:
+        return 0
+    return max(fuzz.ratio(prefix[:len(alias)], alias) for alias in aliases)
+
+
+def upright_rects(rects):
+    """
+    Return the box rectangles in the card's own frame.
+
+    A card lying on its side gives mostly vertical boxes, whose crops
+    crop_text_box turns a quarter counter-clockwise to read them; the
+    coordinates get the same rotation so "below" and "right" follow the text.
+    """
+    vertical = sum(y1 - y0 > x1 - x0 for x0, y0, x1, y1 in rects)
+    if vertical * 2 <= len(rects):
+        return list(rects)
+    return [(y0, -x1, y1, -x0) for x0, y0, x1, y1 in rects]
+
+
+def reading_lines(rects):
+    """
+    Group boxes into text lines, top to bottom, each line left to right.
+
+    A box joins the current line when its vertical centre falls inside the
+    line's first box, which tolerates slightly skewed cards better than
+    comparing top edges.
+    """
+    lines = []
+    for index in sorted(range(len(rects)), key=lambda i: (rects[i][1] + rects[i][3]) / 2):
+        _, y0, _, y1 = rects[index]
+        centre_y = (y0 + y1) / 2
+        if lines:
+            _, ly0, _, ly1 = rects[lines[-1][0]]
+            if ly0 <= centre_y <= ly1:
+                lines[-1].append(index)
+                continue
+        lines.append([index])
+    return [sorted(line, key=lambda i: rects[i][0]) for line in lines]
+
+
+def value_run(index, rects, lines, stop=()):
+    """
+    Indices of the box at `index` and the boxes following it closely on its
+    line (one value split over several boxes), up to any box in `stop`.
+    """
+    line = next(line for line in lines if index in line)
+    run = [index]
+    for other in line[line.index(index) + 1:]:
+        height = max(rects[run[-1]][3] - rects[run[-1]][1], 1.0)
+        if other in stop or rects[other][0] - rects[run[-1]][2] > VALUE_GAP * height:
+            break
+        run.append(other)
+    return run
+
+
+def field_values(words, id_type):
+    """
+    Resolve the fields of an `id_type` card by label -> value geometry.
+
+    `words` are OCR words [(box, (text, score)), ...]. Returns {field: (text, [word indices])}
+    for the fields of LAYOUT_FIELDS[id_type] whose label and value were found;
+    fields left out are for the caller to extract another way.
+    """
+    fields = LAYOUT_FIELDS.get(id_type)
+    if not fields or not words:
+        return {}
+
+    texts = [text for _, (text, _) in words]
+    rects = upright_rects([box_rect(box) for box, _ in words])
+    lines = reading_lines(rects)
+
+    # Each box is the label of at most one field, the one it resembles most
+    labels = {}
+    for index, text in enumerate(texts):
+        scores = {field: label_score(text, aliases) for field, (aliases, _) in fields.items()}
+        field = max(scores, key=scores.get)
+        if scores[field] >= LABEL_SIMILARITY and (field not in labels or scores[field] > labels[field][1]):
+            labels[field] = (index, scores[field])
+    label_boxes = {index for index, _ in labels.values()}
+
+    values = {}
+    for field, (index, _) in labels.items():
+        right, below = None, None
+        for other in adjacent_boxes(index, rects):
+            if rects[other][1] > (rects[index][1] + rects[index][3]) / 2:
+                below = other
+            else:
+                right = other
+        for direction in fields[field][1]:
+            if direction == "same":
+                values[field] = (texts[index], [index])
+                break
+            start = right if direction == "right" else below
+            if start is not None and start not in label_boxes:
+                run = value_run(start, rects, lines, stop=label_boxes)
+                values[field] = (" ".join(texts[i] for i in run), run)
+                break
+    return values
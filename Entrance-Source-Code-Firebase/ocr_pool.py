@@ -0,0 +1,338 @@
+import gc
+import multiprocessing
+import os
+import time
+
+
+def _serve(conn, profile, overrides):
+    """Child process: load the model once, then answer scan requests until told to stop."""
+    try:
+        import ocr_utils
+        if profile or overrides:
+            ocr_utils.configure_engine(profile, **overrides)
+        warm_up_seconds = ocr_utils.warm_up()
+    except Exception as e:
+        conn.send(("error", f"Failed to load OCR model: {e}"))
+        return
+    conn.send(("ready", warm_up_seconds))
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return  # The parent went away
+        if request is None:
+            return
+        images, options = request
+        try:
+            conn.send(("ok", ocr_utils.scan_id_burst(images, **options)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+
+
+def retry_result(seconds):
+    """The result of a scan that was abandoned: no fields, status "retry"."""
+    return {
+        "name": "Name not found",
+        "id_type": "Unknown ID Type",
+        "id_number": "Not Found",
+        "id_number_valid": False,
+        "text": "",
+        "confidence": 0.0,
+        "field_confidence": {"name": 0.0, "id_type": 0.0, "id_number": 0.0},
+        "frames_used": 0,
+        "timings": {"total": seconds},
+        "status": "retry",
+    }
+
+
+class OCRProcess:
+    """
+    A child process running `scan_id_burst`, killed and replaced when a scan overruns.
+
+    PaddleOCR inference cannot be interrupted from Python, so a thread stuck on
+    a pathological frame (heavy texture, hundreds of text boxes) would hold the
+    lane until it finished. Here a scan that misses its deadline gets the child
+    killed and a fresh one started (it reloads and warms the model in the
+    background), and the caller gets a "retry" result straight away.
+
+    `profile` and `overrides` are passed to `ocr_utils.configure_engine` in the
+    child. Only one scan runs at a time; callers serialise (the kiosk's
+    OCRJobExecutor already does).
+
+    Usage:
+        ocr_process = OCRProcess()
+        ocr_process.start()
+        ocr_process.wait_ready()
+        scan = ocr_process.scan_burst(card_images, timeout=10.0, time_budget=4.0)
+        if scan["status"] == "retry":
+            ...  # Ask the visitor to present the card again
+    """
+
+    def __init__(self, profile=None, **overrides):
+        self.profile = profile
+        self.overrides = overrides
+        self.restarts = 0
+        # "spawn" everywhere: the child must not inherit the parent's Qt or camera state
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._ready = False
+
+    def start(self):
+        """Start the child process; the model loads in the background (see wait_ready)."""
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(target=_serve, args=(child_conn, self.profile, self.overrides),
+                                              daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._ready = False
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait up to `timeout` seconds (None: forever) for the model to load.
+
+        Returns the warm-up inference time in seconds, or None if the child
+        is not ready yet. Raises RuntimeError if the model failed to load.
+        """
+        if self._ready:
+            return 0.0
+        try:
+            if not self._conn.poll(timeout):
+                return None
+            status, payload = self._conn.recv()
+        except EOFError:
+            raise RuntimeError("OCR process exited while loading the model")
+        if status != "ready":
+            raise RuntimeError(payload)
+        self._ready = True
+        return payload
+
+    def scan_burst(self, images, timeout, **options):
+        """
+        Run `ocr_utils.scan_id_burst(images, **options)` in the child, waiting at most `timeout` seconds.
+
+        The wait includes a replacement process that is still loading. If the
+        scan does not come back in time, or the child dies, the child is
+        recycled and a result with status "retry" is returned. Raises
+        RuntimeError if the pipeline raised in the child.
+        """
+        start = time.monotonic()
+        try:
+            if self.wait_ready(timeout) is None:
+                print(f"OCR process still loading after {timeout:.1f}s")
+                return retry_result(time.monotonic() - start)
+            self._conn.send((list(images), options))
+            remaining = max(0.0, timeout - (time.monotonic() - start))
+            if self._conn.poll(remaining):
+                status, payload = self._conn.recv()
+                if status != "ok":
+                    raise RuntimeError(payload)
+                return payload
+            print(f"OCR did not finish within {timeout:.1f}s, recycling the OCR process")
+        except (EOFError, BrokenPipeError, ConnectionResetError):
+            print("OCR process died, recycling it")
+        self.recycle()
+        return retry_result(time.monotonic() - start)
+
+    def recycle(self):
+        """Kill the child (it may be stuck in inference) and start a fresh one."""
+        self._kill()
+        self.restarts += 1
+        self.start()
+
+    def _kill(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.kill()
+        if self._process is not None:
+            self._process.join(timeout=5.0)
+        if self._conn is not None:
+            self._conn.close()
+        self._process, self._conn = None, None
+
+    def close(self):
+        """Ask the child to exit, killing it if it does not within a few seconds."""
+        if self._conn is not None:
+            try:
+                self._conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        if self._process is not None:
+            self._process.join(timeout=3.0)
+        self._kill()
+
+
+def process_memory(pid=None):
+    """
+    Resident (RSS) and proportional (PSS) memory of a process in MB.
+
+    PSS splits each shared page between the processes mapping it, so the PSS
+    of a parent and its forked workers adds up to what they really use, while
+    their RSS counts the shared model once per process. Read from /proc
+    (Linux); the values are None where it is not available.
+    """
+    memory = {"rss_mb": None, "pss_mb": None}
+    try:
+        with open(f"/proc/{pid or os.getpid()}/smaps_rollup") as fh:
+            for line in fh:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    memory[f"{key.lower()}_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return memory
+
+
+def _init_pool_worker(reports, shared, profile, overrides, initializer, initargs):
+    """Pool worker start-up: load a model of its own unless one was inherited, then report how long it took."""
+    start = time.perf_counter()
+    if not shared:
+        import ocr_utils
+        if profile or overrides:
+            ocr_utils.configure_engine(profile, **overrides)
+        ocr_utils.warm_up()
+    if initializer is not None:
+        initializer(*initargs)
+    reports.put((os.getpid(), time.time(), time.perf_counter() - start))
+
+
+def _pool_scan(image, options):
+    import ocr_utils
+    return ocr_utils.scan_id(image, **options)
+
+
+def _pool_scan_burst(images, options):
+    import ocr_utils
+    return ocr_utils.scan_id_burst(images, **options)
+
+
+class OCRWorkerPool:
+    """
+    N OCR worker processes forked from a parent that has already loaded the model.
+
+    Each process importing ocr_utils on its own pays the model load and keeps a
+    private copy of the weights. Here the parent loads and warms the model once
+    and the workers are forked from it, so they start in milliseconds and share
+    the weights copy-on-write; only the pages a worker writes (inference
+    buffers, Python objects it touches) become its own. The parent's objects
+    are moved out of the garbage collector's reach (gc.freeze) before forking
+    so that collections in the workers do not copy them.
+
+    With `max_tasks_per_child` a worker is replaced after that many tasks,
+    which hands the memory it has privately accumulated back and costs only
+    another fork. Where "fork" is not available (Windows), or with
+    share_model=False, every worker loads its own model instead.
+
+    Scans may be submitted from several threads at once (one per entrance
+    lane, say); they run in whichever worker is free. Unlike OCRProcess a
+    scan cannot be abandoned part-way.
+
+    Usage:
+        pool = OCRWorkerPool(workers=3, max_tasks_per_child=200).start()
+        scan = pool.scan_burst(card_images, time_budget=4.0)
+        print(pool.report())
+        pool.close()
+        pool.join()
+    """
+
+    def __init__(self, workers=2, max_tasks_per_child=None, profile=None, share_model=None,
+                 initializer=None, initargs=(), **overrides):
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.profile = profile
+        self.overrides = overrides
+        self.initializer = initializer
+        self.initargs = initargs
+        fork = "fork" in multiprocessing.get_all_start_methods()
+        self.share_model = fork if share_model is None else share_model and fork
+        self.model_load_seconds = None
+        self._context = multiprocessing.get_context("fork" if self.share_model else "spawn")
+        self._reports = self._context.SimpleQueue()
+        self._started_at = None
+        self._workers = {}
+        self._pool = None
+
+    def start(self, timeout=None):
+        """
+        Load the model (shared mode) and start the workers, waiting up to
+        `timeout` seconds (None: forever) for all of them to be ready. Returns self.
+        """
+        if self.share_model:
+            import ocr_utils
+            start = time.perf_counter()
+            if self.profile or self.overrides:
+                ocr_utils.configure_engine(self.profile, **self.overrides)
+            ocr_utils.warm_up()
+            self.model_load_seconds = time.perf_counter() - start
+            gc.freeze()
+        else:
+            print("Model sharing unavailable or disabled: each OCR worker loads its own model")
+
+        self._started_at = time.time()
+        self._pool = self._context.Pool(
+            self.workers, initializer=_init_pool_worker,
+            initargs=(self._reports, self.share_model, self.profile, self.overrides, self.initializer, self.initargs),
+            maxtasksperchild=self.max_tasks_per_child,
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while len(self._workers) < self.workers and (deadline is None or time.monotonic() < deadline):
+            self._collect_reports()
+            time.sleep(0.01)
+        return self
+
+    def _collect_reports(self):
+        while not self._reports.empty():
+            pid, ready_at, init_seconds = self._reports.get()
+            self._workers[pid] = {"ready_after": ready_at - self._started_at, "init": init_seconds}
+
+    def scan(self, image, **options):
+        """Run `ocr_utils.scan_id(image, **options)` in a free worker."""
+        return self._pool.apply(_pool_scan, (image, options))
+
+    def scan_burst(self, images, **options):
+        """Run `ocr_utils.scan_id_burst(images, **options)` in a free worker."""
+        return self._pool.apply(_pool_scan_burst, (list(images), options))
+
+    def imap_unordered(self, func, iterable, chunksize=1):
+        """Pool.imap_unordered over the workers, for batch jobs with their own task function."""
+        return self._pool.imap_unordered(func, iterable, chunksize)
+
+    def report(self):
+        """
+        Start-up cost and memory of the pool.
+
+        "workers_started" counts every worker forked so far, replacements
+        included. Per live worker: "init" is its start-up work in seconds
+        (near zero with a shared model), "ready_after" the seconds from pool
+        creation until it was ready, plus its RSS and PSS in MB.
+        """
+        self._collect_reports()
+        live = {child.pid for child in multiprocessing.active_children()}
+        workers = {pid: dict(stats, **process_memory(pid)) for pid, stats in self._workers.items() if pid in live}
+        parent = process_memory()
+        processes = [parent] + list(workers.values())
+        totals = {}
+        for key in ("rss_mb", "pss_mb"):
+            values = [memory[key] for memory in processes]
+            totals[key] = round(sum(values), 1) if None not in values else None
+        return {
+            "shared_model": self.share_model,
+            "model_load": self.model_load_seconds,
+            "workers_started": len(self._workers),
+            "parent": parent,
+            "workers": workers,
+            "total": totals,
+        }
+
+    def close(self):
+        """Accept no more tasks; the workers exit once the queued ones are done (see join)."""
+        self._pool.close()
+
+    def join(self):
+        """Wait for the workers to exit, after close or terminate."""
+        self._pool.join()
+
+    def terminate(self):
+        """Stop the workers straight away, dropping queued tasks."""
+        self._pool.terminate()
@@ -0,0 +1,321 @@
+"""
+Local OCR service: one PaddleOCR model shared by several kiosks over HTTP.
+
+Every request runs the normal scan_id pipeline on its own thread. Detection
+and angle classification take turns on the shared model, while text line
+recognition is batched across requests: a recognition call waits up to the
+batching window (20 ms by default) for the other scans in flight to submit
+their crops, and all of them go through the recognizer in one call.
+
+    python ocr_service.py --port 8765                   # serve on 127.0.0.1:8765
+    python ocr_service.py --host 0.0.0.0 --window-ms 30  # gate server for several lanes
+
+    POST /scan?mode=fields&budget=4.0   body: a JPEG or PNG image -> scan_id result as JSON
+    POST /scan?cache=0                  the same, never answered from the result cache
+    POST /cache/clear                   -> {"status": "ok"}; forget every cached result
+    GET  /health                        -> {"status": "ok", "batches": ..., ...}
+
+Kiosks use it by setting OCR_SERVICE_URL (e.g. http://127.0.0.1:8765); see
+ServiceClient, which returns a "retry" result when the service cannot answer.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+import cv2
+import numpy as np
+import ocr_utils
+from ocr_pool import retry_result
+from ocr_timing import timing_stats
+
+BATCH_WINDOW = 0.02     # Seconds a recognition call waits for other requests' crops
+MAX_BATCH_CROPS = 96    # A batch runs at once when it has this many crops
+
+
+class LockedModel:
+    """Serialises calls to a PaddleOCR predictor (detector or classifier) shared between threads."""
+
+    def __init__(self, model, lock):
+        self._model = model
+        self._lock = lock
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self._model(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+class RecognitionBatcher:
+    """
+    Stands in for PaddleOCR's text recognizer and merges concurrent calls into one.
+
+    The first caller waits up to `window` seconds while other requests in
+    flight (see `track`) submit their crops, then recognises all of them in
+    one call under the model lock and hands each caller its own results. A
+    lone request does not wait. Crops are grouped by recognizer input shape,
+    which recognize_text sets per call; the shape is kept per thread here so
+    concurrent calls cannot see each other's.
+    """
+
+    def __init__(self, recognizer, lock, window=BATCH_WINDOW, max_crops=MAX_BATCH_CROPS):
+        self._recognizer = recognizer
+        self._lock = lock
+        self.window = window
+        self.max_crops = max_crops
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._leading = False
+        self._in_flight = 0
+        self.calls = 0
+        self.batches = 0
+
+    @property
+    def rec_image_shape(self):
+        return getattr(self._local, "shape", None) or self._recognizer.rec_image_shape
+
+    @rec_image_shape.setter
+    def rec_image_shape(self, shape):
+        self._local.shape = list(shape)
+
+    def __getattr__(self, name):
+        return getattr(self._recognizer, name)
+
+    @contextlib.contextmanager
+    def track(self):
+        """Count a request as in flight, so batches wait for its crops."""
+        with self._cond:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def __call__(self, crops):
+        slot = {"crops": list(crops), "shape": tuple(self.rec_image_shape), "done": threading.Event()}
+        with self._cond:
+            self._pending.append(slot)
+            self._cond.notify_all()
+            leader = not self._leading
+            if leader:
+                self._leading = True
+                deadline = time.monotonic() + self.window
+                # Every request in flight submitted (or the window is over): no point waiting longer
+                while (len(self._pending) < self._in_flight
+                       and sum(len(pending["crops"]) for pending in self._pending) < self.max_crops):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._leading = False
+        if leader:
+            self._run(batch)
+        slot["done"].wait()
+        if "error" in slot:
+            raise slot["error"]
+        return slot["result"], slot["elapse"]
+
+    def _run(self, batch):
+        try:
+            for shape in {slot["shape"] for slot in batch}:
+                group = [slot for slot in batch if slot["shape"] == shape]
+                crops = [crop for slot in group for crop in slot["crops"]]
+                with self._lock:
+                    default_shape = self._recognizer.rec_image_shape
+                    self._recognizer.rec_image_shape = list(shape)
+                    try:
+                        rec_res, elapse = self._recognizer(crops)
+                    finally:
+                        self._recognizer.rec_image_shape = default_shape
+                start = 0
+                for slot in group:
+                    slot["result"], slot["elapse"] = rec_res[start:start + len(slot["crops"])], elapse
+                    start += len(slot["crops"])
+            with self._cond:
+                self.calls += len(batch)
+                self.batches += 1
+        except Exception as e:
+            for slot in batch:
+                slot.setdefault("error", e)
+        finally:
+            for slot in batch:
+                slot["done"].set()
+
+    def stats(self):
+        return {"recognition_calls": self.calls, "batches": self.batches,
+                "calls_per_batch": round(self.calls / self.batches, 2) if self.batches else 0.0}
+
+
+def install_batching(window=BATCH_WINDOW, max_crops=MAX_BATCH_CROPS):
+    """Make the shared model safe for concurrent scans, batching recognition. Returns the RecognitionBatcher."""
+    ocr = ocr_utils.get_ocr()
+    lock = threading.Lock()
+    ocr.text_detector = LockedModel(ocr.text_detector, lock)
+    if getattr(ocr, "text_classifier", None) is not None:
+        ocr.text_classifier = LockedModel(ocr.text_classifier, lock)
+    ocr.text_recognizer = RecognitionBatcher(ocr.text_recognizer, lock, window, max_crops)
+    return ocr.text_recognizer
+
+
+class ScanHandler(BaseHTTPRequestHandler):
+    server_version = "EntranceOCR/1.0"
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(200, dict(status="ok", **self.server.batcher.stats()))
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path == "/cache/clear":
+            ocr_utils.ocr_cache.clear()
+            self._send_json(200, {"status": "ok"})
+            return
+        if url.path != "/scan":
+            self._send_json(404, {"error": "not found"})
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR) if body else None
+        if image is None:
+            self._send_json(400, {"error": "the body must be a JPEG or PNG image"})
+            return
+
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        mode = params.get("mode")
+        if mode not in (None, "fields", "full"):
+            self._send_json(400, {"error": f"unknown mode '{mode}'"})
+            return
+        try:
+            deadline = time.perf_counter() + float(params["budget"]) if "budget" in params else None
+        except ValueError:
+            self._send_json(400, {"error": "budget must be a number of seconds"})
+            return
+        # The client turns the cache off for the later frames of a burst, as scan_id_burst does locally
+        use_cache = self.server.use_cache and params.get("cache") != "0"
+
+        try:
+            with self.server.batcher.track():
+                scan = ocr_utils.scan_id(image, use_cache=use_cache, mode=mode, deadline=deadline)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        self._send_json(200, scan)
+
+    def _send_json(self, code, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ServiceClient:
+    """
+    Thin client of the OCR service with the scan_id interface.
+
+    `scan` sends the image as JPEG and returns the service's scan_id result.
+    If the service cannot be reached, answers with an error or takes longer
+    than `timeout` seconds, the result has status "retry" and no fields (see
+    ocr_pool.retry_result) rather than running an unbounded OCR in this
+    process, so the visitor is asked for another capture. Pass `scan` to
+    ocr_utils.scan_id_burst to OCR a burst through the service, and call
+    `clear_cache` once a visitor is accepted so the next card is not answered
+    from the service's cache.
+    """
+
+    def __init__(self, url, timeout=10.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.failures = 0
+
+    def healthy(self, timeout=2.0):
+        """True if the service answers its health check."""
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=timeout) as response:
+                return json.loads(response.read()).get("status") == "ok"
+        except (OSError, ValueError):
+            return False
+
+    def clear_cache(self, timeout=2.0):
+        """Empty the service's result cache. True if the service did."""
+        request = urllib.request.Request(f"{self.url}/cache/clear", data=b"", method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read()).get("status") == "ok"
+        except (OSError, ValueError) as e:
+            print(f"Could not clear the OCR service cache: {e}")
+            return False
+
+    def scan(self, image, use_cache=True, mode=None, deadline=None):
+        """scan_id over HTTP. `use_cache` only matters if the service was started with --cache."""
+        start = time.perf_counter()
+        image = ocr_utils.load_image(image)
+        query = {"mode": mode} if mode else {}
+        if not use_cache:
+            query["cache"] = "0"
+        if deadline is not None:
+            query["budget"] = f"{max(0.0, deadline - time.perf_counter()):.3f}"
+        _, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        request = urllib.request.Request(f"{self.url}/scan?{urlencode(query)}", data=encoded.tobytes(),
+                                         headers={"Content-Type": "image/jpeg"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                scan = json.loads(response.read())
+            # Timed on the service; recorded here so the kiosk's aggregate covers it
+            timing_stats.record(scan["timings"])
+            return scan
+        except urllib.error.HTTPError as e:
+            print(f"OCR service error {e.code}: {e.read().decode('utf-8', 'replace')}")
+        except (OSError, ValueError) as e:
+            print(f"OCR service unavailable: {e}")
+        self.failures += 1
+        return retry_result(time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the ID OCR pipeline over HTTP with batched recognition.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help="How long a recognition call waits for other requests' crops")
+    parser.add_argument("--max-crops", type=int, default=MAX_BATCH_CROPS,
+                        help="Crops at which a batch runs without waiting out the window")
+    parser.add_argument("--profile", help="OCR engine profile (see ocr_utils.ENGINE_PROFILES)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse results for near-identical images. One cache serves every client and is "
+                             "cleared when any of them accepts a visitor, so enable it for a single lane only")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        ocr_utils.configure_engine(args.profile)
+    print(f"Warm-up inference {ocr_utils.warm_up():.2f}s")
+
+    server = ThreadingHTTPServer((args.host, args.port), ScanHandler)
+    server.daemon_threads = True
+    server.batcher = install_batching(args.window_ms / 1000, args.max_crops)
+    server.use_cache = args.cache
+    print(f"OCR service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+
+class StageTimer:
+    """
+    Collects per-stage durations (in seconds) for one pipeline call.
+
+    Usage:
+        timer = StageTimer()
+        with timer.stage("det"):
+            ...
+        timer.timings  # {"det": 0.123}
+
+    A stage entered more than once accumulates its time.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def finish(self):
+        """Record the wall time since the timer was created as "total" and return the timings."""
+        self.timings["total"] = time.perf_counter() - self._start
+        return self.timings
+
+
+class TimingStats:
+    """
+    Opt-in aggregate of stage timings across pipeline calls.
+
+    Disabled by default so `record` is a no-op; enable it with `enable()` or
+    by setting OCR_TIMING_STATS=1. Keeps the last `max_samples` durations per
+    stage for the percentiles and a running count of all calls.
+    """
+
+    def __init__(self, max_samples=1000, enabled=False):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def record(self, timings):
+        if not self.enabled:
+            return
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self.max_samples)).append(seconds)
+                self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def summary(self):
+        """Return {stage: {"count", "mean_ms", "p95_ms"}}."""
+        with self._lock:
+            samples = {stage: np.asarray(values) * 1000.0 for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            stage: {
+                "count": counts[stage],
+                "mean_ms": round(float(values.mean()), 2),
+                "p95_ms": round(float(np.percentile(values, 95)), 2),
+            }
+            for stage, values in samples.items()
+        }
+
+    def dump(self, file=None):
+        """Print the summary table."""
+        file = file or sys.stdout
+        summary = self.summary()
+        if not summary:
+            print("No OCR timings recorded (is OCR_TIMING_STATS enabled?)", file=file)
+            return
+        print(f"{'stage':<30}{'count':>8}{'mean ms':>10}{'p95 ms':>10}", file=file)
+        for stage, stats in summary.items():
+            print(f"{stage:<30}{stats['count']:>8}{stats['mean_ms']:>10.1f}{stats['p95_ms']:>10.1f}", file=file)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# Process-wide aggregate used by the OCR pipeline
+timing_stats = TimingStats(enabled=os.environ.get("OCR_TIMING_STATS") == "1")
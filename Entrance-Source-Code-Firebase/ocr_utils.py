@@ -1,15 +1,17 @@
 import re
-from thefuzz import fuzz, process
+from thefuzz import fuzz
 import cv2
-import qrcode
 import numpy as np
-import matplotlib.pyplot as plt
-from paddleocr import PaddleOCR
 import uuid
 import os
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, db
+from ocr_timing import StageTimer, timing_stats
+from id_templates import ID_TEMPLATES, clean_name_part, find_id_type, keyword_types, rank_id_types
+from id_validators import DIGIT_LOOKALIKES
+from ocr_layout import PREFIX_ASPECT, box_rect, field_values, header_indices, prefix_crop, select_field_boxes
 
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,6 +20,10 @@ cred_path = os.path.join(script_dir, "ocr-access-control-46a21-firebase-adminsdk
 
 # Firebase initialization (singleton pattern)
 def initialize_firebase():
+    # Imported on first use so importing this module stays fast
+    import firebase_admin
+    from firebase_admin import credentials
+
     if not firebase_admin._apps:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         cred_path = os.path.join(script_dir, "ocr-access-control-46a21-firebase-adminsdk-fbsvc-a648214418.json")
@@ -37,10 +43,16 @@ def initialize_firebase():
             return False
     return True
 
-def insert_vehicle_entry(full_name, id_type, id_number, qr_code):
-    """Insert vehicle entry with transaction-based sequential IDs."""
+def insert_vehicle_entry(full_name, id_type, id_number, qr_code, id_number_valid=True):
+    """
+    Insert vehicle entry with transaction-based sequential IDs.
+
+    `id_number_valid` is False for a number that did not fit its card's format
+    (see extract_fields); the entry is written but flagged for the guard to check.
+    """
     if not initialize_firebase():
         return None
+    from firebase_admin import db
 
     try:
         ref = db.reference('NonResidentLogs')
@@ -60,6 +72,7 @@ def insert_vehicle_entry(full_name, id_type, id_number, qr_code):
                 'id_type': id_type,
                 'id_number': id_number,
                 'qr_code': qr_code,
+                'id_number_valid': id_number_valid,
                 'entry_time': datetime.now().isoformat(),
                 'exit_time': None
             }
@@ -76,6 +89,8 @@ def insert_vehicle_entry(full_name, id_type, id_number, qr_code):
 
 def generate_qr_code(data):
     """Generate QR Code and save it as an image."""
+    import qrcode
+
     qr = qrcode.make(data)
 
     # Ensure the directory exists
@@ -89,374 +104,959 @@ def generate_qr_code(data):
     return qr_path
 
 def detect_id_type(extracted_text):
-    """Detect the ID type based on extracted text."""
-    # Remove common phrases that may interfere with detection
-    extracted_text = re.sub(r"\b(REPUBLIC OF THE PHILIPPINES|REPUBLIKA NG PILIPINAS|Republic of the Philippines|Republika ng Pilipinas)\b", "", extracted_text, flags=re.IGNORECASE)
-
-    # ID keyword patterns
-    id_keywords = {
-        "Philippine National ID": [
-            r"PAMBANSANG\s*PAGKAKAKILANLAN\s*", 
-            r"Philippine\s*Identification\s*Card\s*"
-        ],
-        "Driver's License": [
-            r"NON-PROFESSIONAL\s*DRIVER'S\s*LICENSE\s*", 
-            r"PROFESSIONAL\s*DRIVER'S\s*LICENSE\s*", 
-            r"DRIVER'S\s*LICENSE\s*", 
-            r"LAND\s*TRANSPORTATION\s*OFFICE\s*", 
-            r"DEPARTMENT\s*OF\s*TRANSPORTATION\s*"
-        ],
-        "Postal ID": [
-            r"POSTAL\s*IDENTITY\s*CARD\s*", 
-            r"Philippine\s*Postal\s*Corporation\s*", 
-            r"POSTAL\s*", 
-            r"PHLPOST\s*"
-        ],
-        "Unified Multi-Purpose ID/SSS ID": [
-            r"Unified\s*Multi-Purpose\s*ID\s*", 
-            r"CRN\s*"
-        ], 
-        "PRC ID": [
-            r"PROFESSIONAL\s*IDENTIFICATION\s*CARD\s*", 
-            r"PROFESSIONAL\s*REGULATION\s*COMMISSION\s*"
-        ],
-        "PhilHealth ID": [
-            r"Philippine\s*Health\s*Insurance\s*Corporation\s*", 
-            r"Health\s*", 
-            r"PhilHealth\s*"
-        ]
-    }
+    """Detect the ID type based on extracted text (see id_templates.ID_TEMPLATES)."""
+    return find_id_type(extracted_text) or "Unknown ID Type"
 
-    # Convert extracted text to lowercase for comparison
-    extracted_text_lower = extracted_text.lower()
+def mask_id_number(full_id):
+    """Mask all but the trailing characters of an ID number, retaining hyphens and spaces."""
+    # Find the positions of the last 4 characters (digits or letters)
+    last_four_indices = range(len(full_id) - 5, len(full_id))  # Get the indices of the last 4 characters
 
-    # Iterate through the ID keywords
-    for id_type, keywords in id_keywords.items():
-        for keyword in keywords:
-            if re.search(keyword.lower(), extracted_text_lower):
-                return id_type  # Return the matched ID type
+    # Mask all characters except the last 4 characters, retaining hyphens and spaces
+    masked_id = []
+    for i, char in enumerate(full_id):
+        if i in last_four_indices or not char.isalnum():
+            masked_id.append(char)  # Retain the last 4 characters, hyphens, and spaces
+        else:
+            masked_id.append("*")  # Mask all other characters
 
-    return "Unknown ID Type"
+    return "".join(masked_id)
+
+def find_registration_number(data, id_type):
+    """
+    Extract the registration number as `extract_registration_number` does, checked against the
+    card's number format before it is masked. Returns (masked number or "Not Found", valid).
+    """
+    template = ID_TEMPLATES.get(id_type)
+    full_id, valid = template.read_number(data) if template else (None, False)
+    return (mask_id_number(full_id), valid) if full_id else ("Not Found", False)
 
 def extract_registration_number(data, id_type):
     """Extract registration number from text based on ID format and mask all but the last 4 characters, retaining hyphens."""
-    id_patterns = {
-        "Philippine National ID": r"\b\d{4}[-\s]?\d{4}[-\s]?\d{4}[-\s]?\d{4}\b",  # 1234-5678-9101-1213 or 1234567891011213
-        "Driver's License": r"\b(?:[A-Z0-9]{2,3}-[A-Z0-9]{2}-[A-Z0-9]{6}|[A-Z0-9]{2,3}-?[0-9]{2,4}-?[0-9]{6})\b",
-        "Postal ID": r"PRN\s*[A-Z0-9]*\s*\d{11,12}[A-Z]?\b",  # PRN E20220548293 or PRN 100141234567P
-        "PRC ID": r"\b[A-Z0-9]{7}\b",  # 0012345 or ABC1234
-        "PhilHealth ID": r"\b\d{2}[-\s]?\d{8}[-\s]?\d{1}\b",  # 12-34567891-2
-        "Unified Multi-Purpose ID/SSS ID": r"\b[A-Z0-9]{3}[-\s]?[A-Z0-9]{4}[-\s]?[A-Z0-9]{7}[-\s]?[A-Z0-9]{1}\b"  # XYZ-0028-1215160-9 or ABC 1234 1234567 D
-    }
-    
-    pattern = id_patterns.get(id_type)
-    if pattern:
-        match = re.search(pattern, data)
-        if match:
-            # Extract the matched ID
-            full_id = match.group(0)
-            
-            # Find the positions of the last 4 characters (digits or letters)
-            last_four_indices = range(len(full_id) - 5, len(full_id))  # Get the indices of the last 4 characters
-            
-            # Mask all characters except the last 4 characters, retaining hyphens and spaces
-            masked_id = []
-            for i, char in enumerate(full_id):
-                if i in last_four_indices or not char.isalnum():
-                    masked_id.append(char)  # Retain the last 4 characters, hyphens, and spaces
-                else:
-                    masked_id.append("*")  # Mask all other characters
-            
-            return "".join(masked_id)
-        else:
-            return "Not Found"
-    return "Not Found"
-
-def fuzzy_match(text, keywords, threshold=70):
-    """
-    Check if extracted text closely matches any expected keyword using case-insensitive comparison.
-    
-    Possible Outputs:
-    - If a match is found above the threshold, returns the matched keyword.
-    - If no match is found, returns the original text.
-    """
-    if not text or not keywords:
-        return text
-    # Case-insensitive comparison using a processor
-    best_match, score = process.extractOne(
-        text,
-        keywords,
-        scorer=fuzz.partial_ratio,
-        processor=lambda x: x.lower()
-    )
-    return best_match if score >= threshold else text
-
-def remove_unwanted_words(text, unwanted_words, threshold=70):
-    """
-    Removes unwanted words or phrases from the extracted text using fuzzy matching.
-    """
-    for word in unwanted_words:
-        # Check if the text contains a fuzzy match to the unwanted word
-        if fuzzy_match(text, [word], threshold) == word:
-            # Remove all case-insensitive occurrences of the unwanted word
-            text = re.sub(re.escape(word), '', text, flags=re.IGNORECASE)
-            # Clean up extra spaces
-            text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def normalize_ocr_spaces(text):
-    """ Insert missing spaces between headers and names. """
-    fixed_text = re.sub(r"(SURNAME|SORNAME|GIVENNAME|MIDDLENAME)",
-                        r" \1 ", text.upper())  # Ensure consistent case
-    fixed_text = re.sub(r'\s+', ' ', fixed_text).strip()  # Normalize multiple spaces
-    return fixed_text
-
+    return find_registration_number(data, id_type)[0]
 
 def extract_name(data, id_type):
     """
     Extracts the full name from the given OCR-extracted text based on ID type, using fuzzy matching.
     """
+    template = ID_TEMPLATES.get(id_type)
+    name = template.find_name(data) if template else None
+    return name or "Name not found"
 
-    keyword_variations = {
-        "Driver's License": {
-            "keywords": ["Last Name", "First Name", "Middle Name"],
-            "unwanted": ["Nationality","Nationallty", "Noticnalty", "Date of Birth", "Weight", "Height", "Sex", "Address", "License No", "Expiration Date", "Agency Code", "Blood Type", "Eyes Color", "Restrictions", "Conditions"]
-        },
-        "Philippine National ID": {
-            "keywords": ["Apelyido/Last Name", "Mga Pangalan/Given Names", "Gitnang Apelyido/Middle Name"],
-            "unwanted": ["Petsang Kapanganakan", "Date of Birth", "Tirahan", "Address", "Philippine Identification Card", "PAMBANSANG PAGKAKAKILANLAN"]
-        },
-        "Postal ID": {
-            "keywords": ["First Name", "Middle Name", "Surname"],
-            "unwanted": ["Philippine Postal Corporation", "POSTAL IDENTITY CARD", "PHILPOSTS", "Address", "PRN", "FINL", "PREMIUM"]
-        },
-        "PRC ID": {
-            "keywords": ["LAST NAME", "FIRST NAME", "MIDDLE NAME"],
-            "unwanted": ["PROFESSIONAL REGULATION COMMISSION", "PROFESSIONAL IDENTIFICATION CARD", "REGISTRATION NO", "REGISTRATION DATE", "VALID UNTIL", "OCCUPATIONAL THERAPY TECHNICIAN"]
-        },
-        "Unified Multi-Purpose ID/SSS ID": {
-            "keywords": ["SURNAME", "GIVEN NAME", "MIDDLE NAME"],
-            "unwanted": ["Unified Multi-Purpose ID", "CRN", "DATE OF BIRTH", "ADDRESS", "FEMALE", "MALE", "SEX", "SURNAME", "GIVEN NAME", "GIVENNAME", "MIDDLE NAME", "NAME"]
-        },
-        "PhilHealth ID": {
-            "keywords": ["First Name", "Middle Name", "Last Name"],
-            "unwanted": ["Philippine Health Insurance Corporation", "SignUnre", "FORMAL ECONOMY", "MALE", "FEMALE", "Date of Birth"]
-        }
-    }
-    
-    # Get keywords and unwanted words for the current ID type
-    keywords = keyword_variations[id_type]["keywords"]
-    unwanted_words = keyword_variations[id_type]["unwanted"]
-    
-    # Driver's License handling (example, apply similar logic to other ID types)
-    if id_type == "Driver's License":
-        name_match = re.search(
-            r"(?:Last|Lest|Lust|Last\s*Nane)\s*Name\s*[,\.\-]?\s*"
-            r"(?:First|Frst|Fist|First\s*Nane)\s*Name\s*[,\.\-]?\s*"
-            r"(?:Middle|Midle|Middie|Middle\s*Nane)\s*Name\s*"
-            r"([A-Z]+)\s*[,\.\-]?\s*([A-Z]+(?:\s+[A-Z]+)*)\s*([A-Z]*)\s*"
-            r"(?=Nationality|Nationallty|Noticnalty|Date\s*of\s*Birth|Weight|Height|Sex|$)",
-            data,
-            re.I
-        )
-        if name_match:
-            last_name, first_name, middle_name = name_match.groups()
-            uncleaned_name = f"{first_name} {middle_name} {last_name}".strip()
-            
-            # Clean extracted name
-            extracted_name = remove_unwanted_words(uncleaned_name, unwanted_words)
-            return extracted_name
-
-        return extracted_name if extracted_name else "Name not found"
-
-
-    elif id_type == "Philippine National ID":
-        # Enhanced regex patterns with strict boundaries
-        last_name_regex = r"""
-            (?:Ap\w*?yido\s*[/\\.\-]?\s*Last[\.\s]*Name\w*)  # Fixed: \s* instead of \s+ for "LastName"
-            \s*([A-Z]+(?:[\s\-][A-Z]+)*)  # Last name capture
-            (?=\s*(?:Mga\s+Pangalan|tga\s+Pargalan|Mga|Mea|Mea\s+Pangalan|Given\s+Names|$))
-        """
-        
-        given_name_regex = r"""
-            (?:Mga\s*Pangalan\s*[/\\]?\s*Given['\s]*Name['\s]?\w*)
-            \s*([A-Z]+(?:[\s\-][A-Z]+)*)  # Given name capture
-            (?=\s*(?:Gitnang['\s-]?Apelyido|[G]?itnang|Gitnang['\s-]?|Midd?l?e\s+Name|$))
-        """
-        
-        middle_name_regex = r"""
-            (?:Gitnang['\s-]*Ap?e?lyi?do\s*[/\\]?\s*Midd?l?e\s*Name\w*)  # Flexible header
-            \s*([A-Z]+(?:[\s\-][A-Z]+)*)  # Middle name capture
-            (?=\s*(?:[PR]?etsa|[PR]?etsa\s*ng\s*Kapanganakan|Date\s+of\s+Birth|$))  # Ensure it stops before irrelevant text
-        """
-
-        # Execute regex with flags
-        last_name_match = re.search(last_name_regex, data, re.X | re.I)
-        given_name_match = re.search(given_name_regex, data, re.X | re.I)
-        middle_name_match = re.search(middle_name_regex, data, re.X | re.I) 
-
-        def clean_ocr_text(text):
-            text = re.sub(r'\s+', ' ', re.sub(r'[^A-Z\s-]', '', text.strip()))  # Remove non-alphabetic chars
-            text = re.sub(r'\b[A-Z]\b', '', text)  # Remove stray single-letter words (like "K")
-            return text.strip()
-
-        last_name = clean_ocr_text(last_name_match.group(1)) if last_name_match else ""
-        given_name = clean_ocr_text(given_name_match.group(1)) if given_name_match else ""
-        middle_name = clean_ocr_text(middle_name_match.group(1)) if middle_name_match else ""
-
-        uncleaned_name = f"{given_name} {middle_name} {last_name}".strip()
-        
-        # Remove unwanted words from extracted name
-        extracted_name = remove_unwanted_words(uncleaned_name, unwanted_words)
-        
-        return extracted_name if extracted_name else "Name not found"
+def name_from_layout(values):
+    """
+    Assemble "GIVEN MIDDLE LAST" from the values found by `ocr_layout.field_values`.
 
-    elif id_type == "Postal ID":
-        name = re.search(
-            r"(?:\w?\sIDENTITY\s*CARD\s*?|\w?\s?CARD\s*?|\w?\s?Suffix)\s*([\w\s]+?)(?=\s\d{2,}|\sPRN|\sPOSTAL|$)",
-            data,
-            re.I  # Added case-insensitive flag
-        )
+    Returns None unless both the given and the last name were found (the
+    middle name is optional), so the caller can fall back to `extract_name`.
+    """
+    if "full_name" in values:
+        # Driver's licence: "LAST, FIRST MIDDLE"; without the comma the first word is the last name
+        text = values["full_name"][0].upper()
+        if re.search(r"[,.]", text):
+            last, rest = re.split(r"[,.]", text, maxsplit=1)
+        else:
+            last, _, rest = text.strip().partition(" ")
+        last, given, middle = clean_name_part(last), clean_name_part(rest), ""
+    else:
+        last, given, middle = (clean_name_part(values[field][0]) if field in values else ""
+                               for field in ("last_name", "given_name", "middle_name"))
+    if not last or not given:
+        return None
+    return " ".join(part for part in (given, middle, last) if part)
 
-        if name:
-            extracted_name = name.group(1).strip()
+# Canonical size of a rectified ID-1 card (85.60 x 53.98 mm at 10 px/mm)
+CARD_WIDTH = 856
+CARD_HEIGHT = 540
 
-            # Apply similar logic from Driver's License (removing unwanted words)
-            extracted_name = remove_unwanted_words(extracted_name, unwanted_words)
+def guide_box(frame_shape):
+    """Return the (x1, y1, x2, y2) guide rectangle drawn on the live feed."""
+    h, w = frame_shape[:2]
+    return w // 4, h // 4, 3 * w // 4, 3 * h // 4
 
-            return extracted_name  
+def order_quad_points(pts):
+    """Order four corner points as top-left, top-right, bottom-right, bottom-left."""
+    pts = np.asarray(pts, dtype=np.float32).reshape(4, 2)
+    sums = pts.sum(axis=1)
+    diffs = np.diff(pts, axis=1).ravel()
+    return np.array([
+        pts[np.argmin(sums)],   # top-left has the smallest x + y
+        pts[np.argmin(diffs)],  # top-right has the smallest y - x
+        pts[np.argmax(sums)],   # bottom-right has the largest x + y
+        pts[np.argmax(diffs)],  # bottom-left has the largest y - x
+    ], dtype=np.float32)
 
-        return extracted_name if extracted_name else "Name not found"
-    
-    elif id_type == "PRC ID":
-        # Step 1: Fix OCR Issues (same as in Unified Multi-Purpose ID/SSS ID)
-        fixed_data = normalize_ocr_spaces(data)
+def find_card_quad(gray, min_area_ratio=0.25):
+    """
+    Find the outline of an ID card in a grayscale region.
 
-        # Keep the original regex patterns
-        last_name_match = re.search(r"(?:\w?\s?LAST\w?\s?NAME)\s*([\w\s]+?)\s*(?:FIRST\w?\s?NAME\w?\s?|$)", fixed_data, re.I)
-        given_name_match = re.search(r"(?:\w?\s?FIRST\w?\s?NAME)\s*([\w\s]+?)\s*(?:MIDDLE\w?\s?NAME\w?\s?|$)", fixed_data, re.I)
-        middle_name_match = re.search(r"(?:\w?\s?MIDDLE\w?\s?NAME)\s*([\w\s]+?)\s*(?:REGISTRATION\w?\s?|$)", fixed_data, re.I)
+    Returns the four ordered corner points, or None if no card-sized
+    quadrilateral covering at least `min_area_ratio` of the region is found.
+    """
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    edges = cv2.Canny(blurred, 50, 150)
+    # Close small gaps in the card border so it forms a single contour
+    edges = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
 
-        # Clean extracted text like in Unified Multi-Purpose ID/SSS ID
-        def clean_ocr_text(text):
-            if not text:
-                return ""
-            text = re.sub(r'[^A-Z\s-]', '', text.strip())  # Remove non-alphabetic chars
-            text = re.sub(r'\b[A-Z]\b', '', text)  # Remove stray single-letter words
-            return re.sub(r'\s+', ' ', text).strip()  # Normalize spaces
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    min_area = min_area_ratio * gray.shape[0] * gray.shape[1]
 
-        last_name = clean_ocr_text(last_name_match.group(1)) if last_name_match else ""
-        given_name = clean_ocr_text(given_name_match.group(1)) if given_name_match else ""
-        middle_name = clean_ocr_text(middle_name_match.group(1)) if middle_name_match else ""
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(contour) < min_area:
+            break
+        perimeter = cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+        if len(approx) == 4 and cv2.isContourConvex(approx):
+            return order_quad_points(approx)
+    return None
 
-        uncleaned_name = f"{given_name} {middle_name} {last_name}".strip()
+def rectify_card(image, quad):
+    """Warp the card outlined by `quad` to the canonical card size, keeping its orientation."""
+    tl, tr, br, bl = quad
+    width = max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))
+    height = max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))
+    out_w, out_h = (CARD_WIDTH, CARD_HEIGHT) if width >= height else (CARD_HEIGHT, CARD_WIDTH)
 
-        # Apply unwanted words removal (same as in Unified Multi-Purpose ID/SSS ID)
-        extracted_name = remove_unwanted_words(uncleaned_name, unwanted_words)
+    target = np.array([[0, 0], [out_w - 1, 0], [out_w - 1, out_h - 1], [0, out_h - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad, target)
+    return cv2.warpPerspective(image, matrix, (out_w, out_h), flags=cv2.INTER_LINEAR)
 
-        return extracted_name if extracted_name else "Name not found"
+def crop_card(frame, box=None, margin=0.1):
+    """
+    Localise the ID card inside the guide box and return a tight, deskewed crop.
 
-    elif id_type == "Unified Multi-Purpose ID/SSS ID":
-        # Step 1: Fix OCR Issues
-        fixed_data = normalize_ocr_spaces(data)
-        
-        # Enhanced regex patterns with strict boundaries
-        # Updated regex patterns with flexible boundaries
-        last_name_regex = r"""
-            \b(?:SURNAME|SORNAME)\b\s*  # Handle OCR errors
-            ([A-Z]+(?:\s[A-Z]+)*)  # Capture last name
-            (?=\s*(?:GIVEN\s*NAME|GIVENNAME))  # Ensure "GIVEN NAME" follows
-            """
-
-        given_name_regex = r"""
-            \b(?:GIVEN\s*NAME|GIVENNAME)\b\s*  # Handle OCR errors
-            ([A-Z]+(?:\s[A-Z]+)*)  # Capture given name
-            (?=\s*(?:MIDDLE\s*NAME|MIDDLENAME|MIDOLE\s*NAME|MIDDLE[\-\.\,]NAME))  # Ensure "MIDDLE NAME" follows
-        """
-
-        middle_name_regex = r"""
-            \b(?:MIDDLE\s*NAME|MIDDLENAME|MIDOLE\s*NAME|MIDDLE[,\.\-]NAME)\b\s*  # Handle OCR errors
-            ([A-Z]+(?:[\s\-][A-Z]+)*)  # Capture middle name
-            (?=\s*(?:SEX|ADORESS|ADDRESS|\n|$))  # Ensure "SEX" or end of line follows
-        """
-
-        # Execute regex with flags (Fixed argument issue)
-        last_name_match = re.search(last_name_regex, fixed_data, re.X | re.I)
-        given_name_match = re.search(given_name_regex, fixed_data, re.X | re.I)
-        middle_name_match = re.search(middle_name_regex, fixed_data, re.X | re.I)
-
-        def clean_ocr_text(text):
-            if not text:
-                return ""
-            text = re.sub(r'[^A-Z\s-]', '', text.strip())  # Remove non-alphabetic chars
-            text = re.sub(r'\b[A-Z]\b', '', text)  # Remove stray single-letter words (like "K")
-            return re.sub(r'\s+', ' ', text).strip()  # Normalize spaces
-
-        last_name = clean_ocr_text(last_name_match.group(1)) if last_name_match else ""
-        given_name = clean_ocr_text(given_name_match.group(1)) if given_name_match else ""
-        middle_name = clean_ocr_text(middle_name_match.group(1)) if middle_name_match else ""
-
-        uncleaned_name = f"{given_name} {middle_name} {last_name}".strip()
-        
-        # Remove unwanted words from extracted name
-        extracted_name = remove_unwanted_words(uncleaned_name, unwanted_words)
-        
-        return extracted_name if extracted_name else "Name not found"
-    
-    elif id_type == "PhilHealth ID":
-        name_match = re.search(
-            r"(?:\d{2}-\d{8}-\d{1})\s*([\w\s,]+?)(?=\s*(?:\w?\s?JANUARY|FEBRUARY|MARCH|APRIL|MAY|JUNE|JULY|AUGUST|SEPTEMBER|OCTOBER|NOVEMBER|DECEMBER|$))",
-            data
-        )
-
-        if name_match:
-            extracted_name = name_match.group(1).strip()
-
-            # Check for comma (indicating last name before first name) and reorder if needed
-            if ',' in extracted_name or '.' in extracted_name:
-                parts = re.split(r'[,\.]', extracted_name)
-                reordered_name = f"{parts[1].strip()} {parts[0].strip()}"
-                cleaned_name = reordered_name
+    The search region is the guide box grown by `margin` on each side, so a card
+    held slightly over the guide lines is still found. If no card outline is
+    detected, the search region itself is returned.
+    """
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = box if box is not None else guide_box(frame.shape)
+    pad_x, pad_y = int((x2 - x1) * margin), int((y2 - y1) * margin)
+    x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+    x2, y2 = min(w, x2 + pad_x), min(h, y2 + pad_y)
+
+    region = frame[y1:y2, x1:x2]
+    gray = region if region.ndim == 2 else cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    quad = find_card_quad(gray)
+    if quad is None:
+        return region.copy()
+    return rectify_card(region, quad)
+
+# Values the extractors return when a field could not be read
+NOT_FOUND_VALUES = ("Name not found", "Not Found", "Unknown ID Type")
+
+def load_image(image):
+    """Return `image` (a file path or a grayscale/BGR/BGRA array) as a 3-channel BGR array."""
+    if isinstance(image, str):
+        # np.fromfile + imdecode also handles non-ASCII paths on Windows
+        image = cv2.imdecode(np.fromfile(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not read image file")
+        return image
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    return image
+
+def sort_text_boxes(dt_boxes):
+    """Sort detected text boxes top-to-bottom, then left-to-right within a row (PaddleOCR's reading order)."""
+    boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            # Boxes whose top-left corners are within 10 px vertically are on the same row
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
             else:
-                cleaned_name = extracted_name  # No comma, use as is
-
-            # Step 1: Clean OCR text (Same as in Unified Multi-Purpose ID/SSS ID)
-            def clean_ocr_text(text):
-                if not text:
-                    return ""
-                text = re.sub(r'[^A-Z\s-]', '', text.strip())  # Remove non-alphabetic characters
-                text = re.sub(r'\b[A-Z]\b', '', text)  # Remove stray single-letter words
-                return re.sub(r'\s+', ' ', text).strip()  # Normalize spaces
-
-            cleaned_name = clean_ocr_text(cleaned_name)
-
-            # Step 2: Remove unwanted words
-            extracted_name = remove_unwanted_words(cleaned_name, unwanted_words)
-
-        return extracted_name if extracted_name else "Name not found"
-    
-    return "Name not found"
-
-def process_image_with_ocr(image_path):
-    """Process an image with OCR and extract relevant information."""
-    # Process the image with OCR
-    result = ocr.ocr(image_path, cls=True)
-    extracted_text = " ".join([word[1][0] for line in result for word in line])
-    print(f"Extracted Text:\n{extracted_text}\n")
+                break
+    return boxes
 
-    # Detect ID type
-    id_type = detect_id_type(extracted_text)
-    print(f"Detected ID Type: {id_type}\n")
+def crop_text_box(image, box):
+    """Perspective-crop a detected text quadrilateral to an upright strip."""
+    points = np.asarray(box, dtype=np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    # Vertical strips are most likely rotated text
+    if crop.shape[0] >= crop.shape[1] * 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+# Number of text boxes the angle classifier samples to estimate card orientation
+ORIENTATION_SAMPLE = 3
+
+def estimate_orientation(ocr, crops, sample_size=ORIENTATION_SAMPLE):
+    """
+    Estimate whether a card is upright from a few of its text boxes.
+
+    Runs the angle classifier on the `sample_size` widest crops (long lines
+    classify most reliably). Returns "upright" or "flipped" when every sampled
+    box agrees with a score above the classifier threshold, else "ambiguous".
+    """
+    widest = sorted(range(len(crops)), key=lambda i: crops[i].shape[1], reverse=True)[:sample_size]
+    _, cls_res, _ = ocr.text_classifier([crops[i] for i in widest])
+    threshold = getattr(ocr.args, "cls_thresh", 0.9)
+
+    labels = {label for label, score in cls_res if score >= threshold}
+    if len(labels) == 1 and all(score >= threshold for _, score in cls_res):
+        return "flipped" if labels == {"180"} else "upright"
+    return "ambiguous"
+
+def rotate_boxes_180(dt_boxes, image_shape):
+    """Map text boxes into the frame of the image rotated by 180 degrees, keeping corner order."""
+    h, w = image_shape[:2]
+    # The old bottom-right corner becomes the new top-left, so roll the corners by two
+    return [np.roll(np.array([w - 1, h - 1], dtype=box.dtype) - box, -2, axis=0) for box in dt_boxes]
+
+def detect_text(image, timer=None, cls="auto"):
+    """
+    Detection and orientation stages of `run_ocr`.
+
+    Returns (image, boxes, crops): the upright BGR image, its text boxes in
+    reading order and the matching line crops ready for recognition.
+    """
+    timer = timer or StageTimer()
+    ocr = get_ocr()
+
+    with timer.stage("preprocess"):
+        image = load_image(image)
+
+    with timer.stage("det"):
+        dt_boxes, _ = ocr.text_detector(image)
+    if dt_boxes is None or len(dt_boxes) == 0:
+        return image, [], []
+
+    with timer.stage("crop"):
+        dt_boxes = sort_text_boxes(dt_boxes)
+        crops = [crop_text_box(image, box) for box in dt_boxes]
+
+    if cls == "auto" and ocr.use_angle_cls:
+        with timer.stage("cls"):
+            orientation = estimate_orientation(ocr, crops)
+        if orientation == "flipped":
+            with timer.stage("crop"):
+                dt_boxes = rotate_boxes_180(dt_boxes, image.shape)
+                image = cv2.rotate(image, cv2.ROTATE_180)
+                dt_boxes = sort_text_boxes(dt_boxes)
+                crops = [crop_text_box(image, box) for box in dt_boxes]
+        elif orientation == "ambiguous":
+            with timer.stage("cls"):
+                crops, _, _ = ocr.text_classifier(crops)
+    elif cls and ocr.use_angle_cls:
+        with timer.stage("cls"):
+            crops, _, _ = ocr.text_classifier(crops)
+
+    return image, dt_boxes, crops
+
+def recognize_text(crops, boxes, indices=None, timer=None, stage="rec", min_aspect=None):
+    """
+    Recognise the crops at `indices` (default: all) in one batched call.
+
+    The recognizer pads every crop to at least its input width (320 px, about
+    6.7 line heights), so a short crop costs as much as a long one.
+    `min_aspect` lowers that floor to `min_aspect` heights for this call.
+
+    Returns {index: (box, (text, score)) or None}, None marking a box whose
+    score fell below PaddleOCR's drop_score.
+    """
+    timer = timer or StageTimer()
+    ocr = get_ocr()
+    indices = list(range(len(crops))) if indices is None else list(indices)
+    if not indices:
+        return {}
+
+    recognizer = ocr.text_recognizer
+    input_shape = recognizer.rec_image_shape
+    if min_aspect:
+        recognizer.rec_image_shape = [input_shape[0], input_shape[1], int(input_shape[1] * min_aspect)]
+    try:
+        with timer.stage(stage):
+            rec_res, _ = recognizer([crops[i] for i in indices])
+    finally:
+        recognizer.rec_image_shape = input_shape
+
+    return {
+        i: (np.asarray(boxes[i]).tolist(), (text, float(score))) if score >= ocr.drop_score else None
+        for i, (text, score) in zip(indices, rec_res)
+    }
+
+def run_ocr(image, timer=None, cls="auto"):
+    """
+    Run PaddleOCR's detection, angle classification and recognition stages.
+
+    Equivalent to `get_ocr().ocr(image, cls=cls)` for a single image, but each stage
+    is timed into `timer` (a StageTimer) when one is given. Returns the
+    recognised words in reading order as [(box, (text, score)), ...].
+
+    `cls` selects the angle classifier: True runs it on every box, False never,
+    and "auto" classifies only a few boxes to estimate the card orientation.
+    An upright card then skips the classifier entirely; an upside-down card is
+    rotated as a whole (so reading order stays correct) and also skips it; only
+    an ambiguous estimate falls back to classifying every box.
+    """
+    _, boxes, crops = detect_text(image, timer, cls)
+    words = recognize_text(crops, boxes, timer=timer)
+    return [words[i] for i in sorted(words) if words[i] is not None]
+
+def past_deadline(deadline):
+    """True once time.perf_counter() has reached `deadline` (None never expires)."""
+    return deadline is not None and time.perf_counter() >= deadline
+
+class FieldRecognition:
+    """
+    Coarse-to-fine recognition of one card image (or, with coarse=False, a
+    plain recognition of every box that keeps the upright image for re-reads).
+
+    After detection, a coarse pass recognises the header boxes in full (they
+    carry the ID type keywords) and only the first few characters of every
+    other box. Boxes whose start reads like a field label ("Last Name",
+    "Apelyido", "PRN", "CRN", ...) or like an ID number, plus the boxes right
+    of or below them, then get a full recognition pass. Addresses, dates and
+    other text are never fully recognised unless `recognize_remaining` is
+    called, which is the fallback when the selected boxes do not yield every field.
+    """
+
+    def __init__(self, image, timer=None, cls="auto", coarse=True, deadline=None):
+        self.timer = timer or StageTimer()
+        self.image, self.boxes, self.crops = detect_text(image, self.timer, cls)
+        self._read = {}        # index -> word (or None) for boxes recognised in full
+        self.selected = set()  # indices whose words are reported
+        if not self.boxes:
+            return
+        if not coarse:
+            # Full mode: every box in one pass, as run_ocr does
+            self.recognize_remaining()
+            return
+
+        rects = [box_rect(box) for box in self.boxes]
+        header = header_indices(rects, self.image.shape[0])
+        body = [i for i in range(len(self.crops)) if i not in header]
+
+        # Coarse pass: header boxes in full, only the start of every other box
+        coarse_crops = [self.crops[i] for i in sorted(header)] + [prefix_crop(self.crops[i]) for i in body]
+        coarse = recognize_text(coarse_crops, [self.boxes[i] for i in sorted(header)] + [self.boxes[i] for i in body],
+                                timer=self.timer, stage="rec_coarse", min_aspect=PREFIX_ASPECT)
+        order = sorted(header) + body
+        prefix_texts = {}
+        for position, index in enumerate(order):
+            word = coarse.get(position)
+            if index in header or coarse_crops[position].shape[1] == self.crops[index].shape[1]:
+                self._read[index] = word  # The coarse crop was the whole box
+            prefix_texts[index] = word[1][0] if word else ""
+
+        # Fine pass: labels, numbers and their neighbours in full
+        self.selected = select_field_boxes(rects, prefix_texts) | header
+        if past_deadline(deadline):
+            print("OCR deadline reached, skipping the fine recognition pass")
+            return
+        self._recognize([i for i in sorted(self.selected) if i not in self._read])
+
+    def _recognize(self, indices):
+        self._read.update(recognize_text(self.crops, self.boxes, indices, timer=self.timer))
+
+    def has_remaining(self):
+        return len(self._read) < len(self.crops) or len(self.selected) < len(self.crops)
+
+    def words(self):
+        """Recognised words of the selected boxes, in reading order."""
+        return [self._read[i] for i in sorted(self.selected) if self._read.get(i) is not None]
+
+    def recognize_remaining(self):
+        """Recognise every box not read yet and report all words, as a full pass would."""
+        self._recognize([i for i in range(len(self.crops)) if i not in self._read])
+        self.selected = set(range(len(self.crops)))
+        return self.words()
+
+# Fields read with a lower confidence get their boxes re-recognised (see retry_weak_fields)
+RETRY_CONFIDENCE = 0.85
+
+def pad_box(box, pad):
+    """Grow a text quadrilateral by `pad` line heights on every side."""
+    tl, tr, br, bl = np.asarray(box, dtype=np.float32)
+    along = (tr - tl) / max(np.linalg.norm(tr - tl), 1.0)
+    across = (bl - tl) / max(np.linalg.norm(bl - tl), 1.0)
+    margin = pad * max(np.linalg.norm(bl - tl), 1.0)
+    return np.array([
+        tl - margin * (along + across),
+        tr + margin * (along - across),
+        br + margin * (along + across),
+        bl - margin * (along - across),
+    ], dtype=np.float32)
+
+def retry_crops(image, box):
+    """
+    Alternative crops of one text box for a second recognition attempt.
+
+    The box is grown a little (detection boxes often clip the tops of capitals
+    and the ends of a line) and re-cropped with cubic upscaling to at least
+    64 px high; a contrast-equalised (CLAHE) copy helps faded or shadowed print.
+    """
+    crop = crop_text_box(image, pad_box(box, 0.15))
+    if crop.shape[0] < 64:
+        scale = 64.0 / max(crop.shape[0], 1)
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    equalised = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4, 4)).apply(gray)
+    return [crop, cv2.cvtColor(equalised, cv2.COLOR_GRAY2BGR)]
+
+def reread_words(image, words, indices, timer=None):
+    """
+    Re-recognise the words at `indices` from `image` with `retry_crops`.
+
+    All variants are recognised in one batched call; a word is replaced when a
+    variant scores higher than the original read. Returns (new words, indices improved).
+    """
+    timer = timer or StageTimer()
+    indices = list(indices)
+    crops, owners = [], []
+    for index in indices:
+        variants = retry_crops(image, words[index][0])
+        crops += variants
+        owners += [index] * len(variants)
+    if not crops:
+        return words, []
+
+    with timer.stage("rec_retry"):
+        rec_res, _ = get_ocr().text_recognizer(crops)
+
+    words = list(words)
+    improved = set()
+    for index, (text, score) in zip(owners, rec_res):
+        if text and score > words[index][1][1]:
+            words[index] = (words[index][0], (text, float(score)))
+            improved.add(index)
+    return words, sorted(improved)
+
+def retry_weak_fields(image, words, fields, timer=None, threshold=RETRY_CONFIDENCE):
+    """
+    Give the fields of an `extract_fields` result read below `threshold` a second look.
+
+    An ID number that does not fit its card's format counts as weak too.
+    Only the boxes the weak fields were read from are re-recognised (fields that
+    were not found at all have no boxes and are left to a new capture). If any
+    re-read scores higher, the fields are extracted again. Returns (words, fields).
+    """
+    weak = [field for field in ("name", "id_number")
+            if fields["field_words"][field] and fields["field_confidence"][field] < threshold]
+    # A number that does not fit the card's format is a misread however confidently it was read
+    if fields["field_words"]["id_number"] and not fields["id_number_valid"] and "id_number" not in weak:
+        weak.append("id_number")
+    if not weak:
+        return words, fields
+
+    indices = sorted({index for field in weak for index in fields["field_words"][field]})
+    print(f"Low confidence for {', '.join(weak)}, re-reading {len(indices)} box(es)...")
+    words, improved = reread_words(image, words, indices, timer)
+    if improved:
+        fields = extract_fields(words, timer)
+    fields["retried"] = weak
+    return words, fields
+
+def perceptual_hash(image, hash_size=16):
+    """
+    Difference hash (dHash) of an image as an int of hash_size * hash_size bits.
+
+    Each bit records whether a pixel of the downscaled grayscale image is
+    brighter than its right neighbour, so small shifts, noise and exposure
+    changes flip only a few bits.
+    """
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class OCRResultCache:
+    """
+    LRU cache of OCR words keyed by perceptual hash, with a Hamming-distance tolerance.
+
+    A lookup hits when a stored hash is within `max_distance` bits of the query
+    and younger than `ttl` seconds. The hash cannot tell two cards of the same
+    type apart: on the sample IDs with the name and number re-rendered, the
+    other visitor's card is as close as the same card re-presented (about 30
+    bits apart at the median, and as little as 2). An entry must therefore
+    never outlive a visit: the TTL is shorter than the kiosk cooldown
+    (scan_flow.COOLDOWN_SECONDS) and scan_id_burst clears the cache once a
+    read is accepted.
+    """
+
+    def __init__(self, max_entries=32, ttl=5.0, max_distance=10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()  # hash -> (stored at, words)
+        self._lock = threading.Lock()
+
+    def get(self, image_hash, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict_expired(now)
+            best_hash, best_distance = None, self.max_distance + 1
+            for stored_hash in self._entries:
+                distance = bin(stored_hash ^ image_hash).count("1")
+                if distance < best_distance:
+                    best_hash, best_distance = stored_hash, distance
+            if best_hash is None:
+                return None
+            self._entries.move_to_end(best_hash)
+            return self._entries[best_hash][1]
+
+    def put(self, image_hash, words, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[image_hash] = (now, words)
+            self._entries.move_to_end(image_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _evict_expired(self, now):
+        # A hit moves an entry to the end without refreshing its age, so check every entry
+        expired = [key for key, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl]
+        for key in expired:
+            del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# Shared by every scan in this process; scan_id(..., use_cache=False) bypasses it
+ocr_cache = OCRResultCache()
+
+# "fields" recognises only the text around field labels (see FieldRecognition); "full" reads every box
+RECOGNITION_MODE = os.environ.get("OCR_RECOGNITION_MODE", "fields")
+
+# Reads a word's look-alike letters as digits, to find the words of a corrected ID number
+DIGIT_FOLD = str.maketrans(DIGIT_LOOKALIKES)
+
+def value_word_indices(words, value, fold=False):
+    """
+    Indices of the OCR words a (possibly masked) field value was read from. With `fold`,
+    a word also matches once its look-alike letters are read as digits ("12I3" for "1213").
+    """
+    if value in NOT_FOUND_VALUES:
+        return []
+    # Separators are dropped first so the visible tail of "***-****-****160-9" is one token, "1609"
+    tokens = re.findall(r"[A-Z0-9]{3,}", re.sub(r"[^A-Z0-9*\s]", "", value.upper()))
+    indices = []
+    for index, (_, (text, _)) in enumerate(words):
+        compact = re.sub(r"[^A-Z0-9]", "", text.upper())
+        if len(compact) < 3:
+            continue
+        variants = (compact, compact.translate(DIGIT_FOLD)) if fold else (compact,)
+        # A token must end the word (the visible tail of a masked number) or be a good part of it,
+        # so "DEL" in a name does not pick up "DELIVERY"; a value split over words has each word in a token
+        if any(token in variant and (variant.endswith(token) or 2 * len(token) >= len(variant))
+               or variant in token for variant in variants for token in tokens):
+            indices.append(index)
+    return indices
+
+def field_confidence(words, indices):
+    """Lowest recognition score among the words a field was read from (0 if it was not found)."""
+    return min((words[index][1][1] for index in indices), default=0.0)
+
+# Below this score gap (one distinctive keyword) the runner-up type is tried when the first misses a field
+ID_TYPE_MARGIN = 3
+
+def read_typed_fields(words, extracted_text, id_type, timer):
+    """
+    Read the ID number and name as printed on an `id_type` card.
+    Returns (number, name, name word indices, whether the number fits the card's format).
+    """
+    # Look the fields up next to their labels; the regexes over the joined text are the fallback
+    with timer.stage("layout"):
+        values = field_values(words, id_type)
 
     # Extract ID Number (Registration Number)
-    registration_number = extract_registration_number(extracted_text, id_type)
-    print(f"Extracted ID Number: {registration_number}\n")
+    with timer.stage("extract_registration_number"):
+        registration_number, number_valid = "Not Found", False
+        if "id_number" in values:
+            registration_number, number_valid = find_registration_number(values["id_number"][0], id_type)
+        if not number_valid:
+            # A read that does not fit next to the label may be read correctly elsewhere on the card
+            number, valid = find_registration_number(extracted_text, id_type)
+            if valid or registration_number == "Not Found":
+                registration_number, number_valid = number, valid
 
     # Extract Name
-    extracted_name = extract_name(extracted_text, id_type)
+    with timer.stage("extract_name"):
+        extracted_name = name_from_layout(values)
+        if extracted_name:
+            name_words = sorted({index for field in ("full_name", "last_name", "given_name", "middle_name")
+                                 if field in values for index in values[field][1]})
+        else:
+            extracted_name = extract_name(extracted_text, id_type)
+            name_words = value_word_indices(words, extracted_name)
+    return registration_number, extracted_name, name_words, number_valid
+
+def extract_fields(words, timer=None):
+    """
+    Run ID type detection and field extraction on OCR words. Returns the scan_id fields.
+
+    Besides the fields, the result has "field_words", the indices into `words`
+    each field was read from, "field_confidence", the lowest recognition
+    score among those words (0 for a field that was not found),
+    "id_number_valid", whether the number fits the card's format once OCR
+    look-alikes are corrected (see id_validators.NumberFormat), and
+    "id_type_ranking", the scored ID types (see id_templates.rank_id_types)
+    with "id_type_margin", the lead of the first over the second.
+    """
+    timer = timer or StageTimer()
+    extracted_text = " ".join([word[1][0] for word in words])
+    confidence = float(np.mean([word[1][1] for word in words])) if words else 0.0
+    print(f"Extracted Text:\n{extracted_text}\n")
+
+    # Detect ID type
+    with timer.stage("detect_id_type"):
+        ranking = rank_id_types(extracted_text)
+    id_type = ranking[0][0] if ranking else "Unknown ID Type"
+    margin = ranking[0][1] - (ranking[1][1] if len(ranking) > 1 else 0) if ranking else 0.0
+    print(f"Detected ID Type: {id_type} (margin {margin:.1f})\n")
+
+    registration_number, extracted_name, name_words, number_valid = read_typed_fields(
+        words, extracted_text, id_type, timer)
+
+    # A close call that leaves a field unread is more likely the other type than a bad capture
+    missing = sum(value in NOT_FOUND_VALUES for value in (registration_number, extracted_name))
+    if missing and len(ranking) > 1 and margin < ID_TYPE_MARGIN:
+        runner_up = ranking[1][0]
+        alternative = read_typed_fields(words, extracted_text, runner_up, timer)
+        if sum(value in NOT_FOUND_VALUES for value in alternative[:2]) < missing:
+            print(f"Reading the card as {runner_up} finds more fields\n")
+            id_type = runner_up
+            registration_number, extracted_name, name_words, number_valid = alternative
+
+    print(f"Extracted ID Number: {registration_number}\n")
+    if registration_number != "Not Found" and not number_valid:
+        print(f"ID number does not fit the {id_type} format, likely a misread\n")
     print(f"Extracted Name: {extracted_name}\n")
 
-    return extracted_name, id_type, registration_number
+    field_words = {
+        # The words that carry one of the type's keywords on their own
+        "id_type": [index for index, word in enumerate(words) if id_type in keyword_types(word[1][0])],
+        "id_number": value_word_indices(words, registration_number, fold=True),
+        "name": name_words,
+    }
+    scores = {field: field_confidence(words, field_words[field]) for field in ("name", "id_number")}
+    # The type needs only one keyword; a keyword split across boxes counts with the mean score
+    scores["id_type"] = max((words[index][1][1] for index in field_words["id_type"]),
+                            default=confidence if id_type != "Unknown ID Type" else 0.0)
+    print("Field confidence: " + ", ".join(f"{field} {score:.2f}" for field, score in scores.items()) + "\n")
+
+    return {
+        "name": extracted_name,
+        "id_type": id_type,
+        "id_number": registration_number,
+        "id_number_valid": number_valid,
+        "text": extracted_text,
+        "confidence": confidence,
+        "field_confidence": scores,
+        "field_words": field_words,
+        "id_type_ranking": ranking,
+        "id_type_margin": margin,
+    }
+
+def scan_id(image, use_cache=True, mode=None, deadline=None):
+    """
+    Run OCR on an image and extract the ID fields.
+
+    Returns a dict with "name", "id_type", "id_number", the joined "text",
+    "confidence", the mean recognition score of the OCR lines (0 when no text
+    was found), "field_confidence" and "field_words" per field (see
+    extract_fields), "retried", the fields whose boxes were re-read,
+    "timings", the seconds spent in each pipeline stage, "cached", whether
+    the OCR words came from `ocr_cache`, and "status" (see `deadline`).
+
+    With `use_cache`, a near-identical image seen within the cache TTL (for
+    example the same card re-presented after a failed read) reuses the
+    previous OCR words instead of running PaddleOCR again.
+
+    `mode` ("fields" or "full", default RECOGNITION_MODE) selects coarse-to-fine
+    recognition of the field regions only, falling back to the remaining
+    boxes when a field is missing, or recognition of every box. Either way a
+    field read below RETRY_CONFIDENCE has its boxes re-recognised once.
+
+    `deadline` (a time.perf_counter() value) bounds the optional work: once it
+    has passed, the fine pass, the fallback to the remaining boxes and the
+    re-read are skipped and "status" is "partial" instead of "ok". A stage
+    already running is not interrupted; see ocr_pool for a hard bound.
+    """
+    timer = StageTimer()
+    status = "ok"
+    mode = mode or RECOGNITION_MODE
+
+    # Process the image with OCR, reusing the words of a near-identical recent image
+    words, image_hash = None, None
+    if use_cache:
+        with timer.stage("hash"):
+            image = load_image(image)
+            image_hash = perceptual_hash(image)
+            words = ocr_cache.get(image_hash)
+    cached = words is not None
+
+    if cached:
+        fields = extract_fields(words, timer)
+    else:
+        recognition = FieldRecognition(image, timer, coarse=(mode == "fields"), deadline=deadline)
+        words = recognition.words()
+        fields = extract_fields(words, timer)
+        if any(fields[key] in NOT_FOUND_VALUES for key in ("name", "id_type", "id_number")) and recognition.has_remaining():
+            if past_deadline(deadline):
+                status = "partial"
+            else:
+                print("Field regions were not enough, recognising the remaining text...")
+                words = recognition.recognize_remaining()
+                fields = extract_fields(words, timer)
+        # A marginal read gets a second look at just the weak field's boxes instead of a new capture
+        if past_deadline(deadline):
+            status = "partial"
+        else:
+            words, fields = retry_weak_fields(recognition.image, words, fields, timer)
 
-# Initialize PaddleOCR model
-ocr = PaddleOCR(use_angle_cls=True, lang='en')
\ No newline at end of file
+    # A partial read must not be served to the next scan of the same card
+    if not cached and image_hash is not None and status == "ok":
+        ocr_cache.put(image_hash, words)
+
+    timings = timer.finish()
+    timing_stats.record(timings)
+
+    fields.setdefault("retried", [])
+    fields.update(timings=timings, cached=cached, status=status)
+    return fields
+
+def process_image_with_ocr(image):
+    """
+    Process an image with OCR and extract relevant information.
+
+    `image` may be a file path or a NumPy array (BGR or grayscale), so frames
+    captured from the camera can be recognised without a round trip to disk.
+    """
+    scan = scan_id(image)
+    return scan["name"], scan["id_type"], scan["id_number"]
+
+def vote_field(results, field, similarity=90):
+    """
+    Pick the value of `field` with the highest total confidence across results.
+
+    Each result votes with its confidence for that field. Values that
+    fuzzy-match each other (OCR variations of the same name) pool their votes;
+    the highest-confidence spelling represents the group.
+    Returns (value, share of the total vote), or (None, 0.0) if no result has the field.
+    """
+    groups = []  # [representative, best confidence, total confidence]
+    for result in results:
+        value = result[field]
+        if value in NOT_FOUND_VALUES:
+            continue
+        weight = result["field_confidence"][field]
+        for group in groups:
+            if fuzz.ratio(value.lower(), group[0].lower()) >= similarity:
+                group[2] += weight
+                if weight > group[1]:
+                    group[0], group[1] = value, weight
+                break
+        else:
+            groups.append([value, weight, weight])
+
+    if not groups:
+        return None, 0.0
+    total = sum(group[2] for group in groups)
+    best = max(groups, key=lambda group: group[2])
+    return best[0], (best[2] / total if total else 0.0)
+
+def fuse_scan_results(results):
+    """
+    Combine several `scan_id` results of the same card by confidence-weighted voting.
+
+    The ID type is voted first; the name and number are then voted only among
+    results that agree with the winning type, since the extractors depend on it.
+    A number that fits the card's format outvotes any number of reads that do not.
+    """
+    id_type, _ = vote_field(results, "id_type", similarity=100)
+    if id_type is None:
+        id_type = "Unknown ID Type"
+    agreeing = [result for result in results if result["id_type"] == id_type] or results
+
+    name, _ = vote_field(agreeing, "name")
+    valid_numbers = [result for result in agreeing if result["id_number_valid"]]
+    id_number, _ = vote_field(valid_numbers or agreeing, "id_number")
+    confidence = max((result["confidence"] for result in agreeing), default=0.0)
+    values = {"name": name, "id_type": id_type, "id_number": id_number}
+    # Each fused field is as confident as the best read of the winning value
+    scores = {field: max((result["field_confidence"][field] for result in agreeing if result[field] == value),
+                         default=0.0)
+              for field, value in values.items()}
+
+    return {
+        "name": name or "Name not found",
+        "id_type": id_type,
+        "id_number": id_number or "Not Found",
+        "id_number_valid": bool(valid_numbers) and id_number is not None,
+        "text": max(agreeing, key=lambda result: result["confidence"])["text"] if agreeing else "",
+        "confidence": confidence,
+        "field_confidence": scores,
+        "frames_used": len(results),
+    }
+
+def scan_id_burst(images, accept_confidence=0.9, time_budget=None, scan=None):
+    """
+    OCR up to len(images) frames of the same card (best first) and fuse the results.
+
+    Stops early once a frame yields every field, with an ID number that fits the
+    card's format, at a per-field confidence of at least `accept_confidence`, so a clean card costs a single OCR run (a weak
+    field already had its targeted re-read inside scan_id). `time_budget`
+    seconds is the deadline passed to scan_id: no new runs start after it and
+    a run still going skips its optional stages. The fused "status" is
+    "partial" if the deadline cut any run short. The runs are sequential
+    because a single PaddleOCR predictor must not be used from several threads at once.
+
+    `scan` replaces scan_id for each run (same arguments and result), for
+    example ocr_service.ServiceClient.scan to OCR on a shared server. A run
+    with status "retry" (the server could not answer) ends the burst and is
+    left out of the fusion; if no run got an answer, that "retry" result is returned.
+    """
+    scan = scan or scan_id
+    start = time.perf_counter()
+    deadline = start + time_budget if time_budget is not None else None
+    results = []
+    for index, image in enumerate(images):
+        # Later frames of the burst would hit the cache entry of the first one and add no information
+        result = scan(image, use_cache=(index == 0), deadline=deadline)
+        if result["status"] == "retry":
+            if not results:
+                return result
+            break
+        results.append(result)
+
+        complete = (all(result[field] not in NOT_FOUND_VALUES for field in ("name", "id_type", "id_number"))
+                    and result["id_number_valid"])
+        if complete and min(result["field_confidence"].values()) >= accept_confidence:
+            break
+        if past_deadline(deadline):
+            break
+
+    fused = fuse_scan_results(results)
+    fused["status"] = "partial" if any(result["status"] == "partial" for result in results) else "ok"
+    # A read with a name gets the visitor accepted; the next card must not be served from it
+    if fused["name"] != "Name not found":
+        ocr_cache.clear()
+    # Stage times summed over the OCR runs of the burst
+    fused["timings"] = {}
+    for result in results:
+        for stage, seconds in result["timings"].items():
+            fused["timings"][stage] = fused["timings"].get(stage, 0.0) + seconds
+    return fused
+
+# PaddleOCR settings per deployment profile, selected with OCR_ENGINE_PROFILE or
+# configure_engine(). "models" lists model directories a profile cannot run without;
+# the quantized and ONNX models are not downloaded automatically, so their
+# locations come from OCR_DET_MODEL_DIR / OCR_REC_MODEL_DIR / OCR_CLS_MODEL_DIR.
+ENGINE_PROFILES = {
+    # PaddleOCR defaults, as the kiosk has always run
+    "default": {"settings": {}},
+    # PP-OCRv4 mobile models with MKL-DNN, for x86 gate PCs
+    "fast": {"settings": {"ocr_version": "PP-OCRv4", "enable_mkldnn": True, "det_limit_side_len": 736}},
+    # Lighter PP-OCRv3 recognizer and smaller detector input for a Raspberry Pi 4 (no MKL-DNN on ARM)
+    "pi": {"settings": {"ocr_version": "PP-OCRv3", "enable_mkldnn": False, "cpu_threads": 4,
+                        "det_limit_side_len": 640, "rec_batch_num": 8}},
+    # int8-quantized (slim) inference models, run through MKL-DNN
+    "int8": {"settings": {"enable_mkldnn": True, "det_limit_side_len": 736},
+             "models": ("det_model_dir", "rec_model_dir")},
+    # ONNX exports of the models (paddle2onnx), run with ONNX Runtime on the CPU
+    "onnx": {"settings": {"use_onnx": True, "det_limit_side_len": 736},
+             "models": ("det_model_dir", "rec_model_dir", "cls_model_dir")},
+}
+
+MODEL_DIR_VARIABLES = {
+    "det_model_dir": "OCR_DET_MODEL_DIR",
+    "rec_model_dir": "OCR_REC_MODEL_DIR",
+    "cls_model_dir": "OCR_CLS_MODEL_DIR",
+}
+
+def engine_settings(profile=None, **overrides):
+    """
+    Return the PaddleOCR keyword arguments for an engine profile.
+
+    `profile` defaults to OCR_ENGINE_PROFILE (or "default"). OCR_CPU_THREADS and
+    the model directory variables are applied on top of the profile, then
+    `overrides`. Raises ValueError for an unknown profile or a missing model directory.
+    """
+    profile = profile or os.environ.get("OCR_ENGINE_PROFILE", "default")
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown OCR engine profile '{profile}' (choose from {', '.join(ENGINE_PROFILES)})")
+
+    settings = {"use_angle_cls": True, "lang": "en"}
+    settings.update(ENGINE_PROFILES[profile]["settings"])
+    if os.environ.get("OCR_CPU_THREADS"):
+        settings["cpu_threads"] = int(os.environ["OCR_CPU_THREADS"])
+    for key, variable in MODEL_DIR_VARIABLES.items():
+        if os.environ.get(variable):
+            settings[key] = os.environ[variable]
+    settings.update(overrides)
+
+    for key in ENGINE_PROFILES[profile].get("models", ()):
+        if not settings.get(key):
+            raise ValueError(f"OCR engine profile '{profile}' needs {key} (set {MODEL_DIR_VARIABLES[key]})")
+    return settings
+
+# PaddleOCR model, created on first use by get_ocr()
+_ocr = None
+_ocr_settings = None
+_ocr_lock = threading.Lock()
+
+def configure_engine(profile=None, **overrides):
+    """
+    Select the engine profile (and any PaddleOCR keyword overrides) used by get_ocr().
+
+    Takes effect on the next get_ocr() call; an already loaded model is
+    dropped. Returns the resolved settings.
+    """
+    global _ocr, _ocr_settings
+    settings = engine_settings(profile, **overrides)
+    with _ocr_lock:
+        _ocr_settings = settings
+        _ocr = None
+    return settings
+
+def get_ocr():
+    """
+    Return the shared PaddleOCR model, loading it on first use.
+
+    Loading takes several seconds (paddle import plus model weights), so the
+    kiosk calls this from a background thread at startup; any other caller
+    arriving meanwhile waits for the same load instead of starting another.
+    """
+    global _ocr, _ocr_settings
+    if _ocr is None:
+        with _ocr_lock:
+            if _ocr is None:
+                from paddleocr import PaddleOCR
+                if _ocr_settings is None:
+                    _ocr_settings = engine_settings()
+                print(f"Loading PaddleOCR with {_ocr_settings}")
+                _ocr = PaddleOCR(**_ocr_settings)
+    return _ocr
+
+def make_dummy_card():
+    """Render a synthetic ID card with a few lines of text, used to warm the model up."""
+    card = np.full((CARD_HEIGHT, CARD_WIDTH, 3), 235, dtype=np.uint8)
+    lines = ["REPUBLIC OF THE PHILIPPINES", "Last Name", "DELA CRUZ", "First Name", "JUAN", "1234-5678-9101-1213"]
+    for i, line in enumerate(lines):
+        cv2.putText(card, line, (40, 70 + i * 75), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (20, 20, 20), 2, cv2.LINE_AA)
+    return card
+
+def warm_up():
+    """
+    Load the model and run one inference on a dummy card.
+
+    The first inference after loading is much slower than the rest (memory
+    allocation, kernel selection), so doing it at startup means the first
+    real visitor hits a hot model. Returns the warm-up time in seconds.
+    """
+    get_ocr()
+    start = time.perf_counter()
+    run_ocr(make_dummy_card())
+    return time.perf_counter() - start
\ No newline at end of file
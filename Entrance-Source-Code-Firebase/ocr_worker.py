@@ -0,0 +1,153 @@
+import os
+import uuid
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+from ocr_utils import insert_vehicle_entry, generate_qr_code, scan_id_burst
+from ocr_pool import OCRProcess
+from ocr_service import ServiceClient
+from ocr_timing import timing_stats
+
+# Soft budget: no new OCR runs (burst frames, fallbacks, re-reads) start after it
+SCAN_BUDGET = 4.0
+# Hard bound on one visitor's OCR; past it the OCR process is killed and replaced.
+# OCR_SUBPROCESS=0 runs OCR on the worker thread instead, without the hard bound.
+SCAN_TIMEOUT = float(os.environ.get("OCR_SCAN_TIMEOUT", "10"))
+USE_OCR_PROCESS = os.environ.get("OCR_SUBPROCESS", "1") != "0"
+# A shared OCR service (see ocr_service.py) to send scans to instead; unset runs OCR on this machine
+OCR_SERVICE_URL = os.environ.get("OCR_SERVICE_URL")
+
+
+class OCRWorker(QObject):
+    """Runs the OCR pipeline and the entry write path on a background thread."""
+    result_ready = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, ocr_process=None, ocr_service=None):
+        super().__init__()
+        self.ocr_process = ocr_process
+        self.ocr_service = ocr_service
+
+    @pyqtSlot(object)
+    def process(self, images):
+        """
+        OCR a burst of captured frames of one card (best first) and fuse the fields.
+        If a name is found, register the visitor and print the pass.
+        """
+        try:
+            if self.ocr_service is not None:
+                scan = scan_id_burst(images, time_budget=SCAN_BUDGET, scan=self.ocr_service.scan)
+                # scan_id_burst only clears this process's cache on accept; the service keeps its own
+                if scan["name"] != "Name not found":
+                    self.ocr_service.clear_cache()
+            elif self.ocr_process is not None:
+                scan = self.ocr_process.scan_burst(images, timeout=SCAN_TIMEOUT, time_budget=SCAN_BUDGET)
+                # scan_id records its timings in the OCR process, but the aggregate dumped on exit is
+                # this process's; the burst's stage times (summed over its OCR runs) are recorded here
+                timing_stats.record(scan["timings"])
+            else:
+                scan = scan_id_burst(images, time_budget=SCAN_BUDGET)
+            if scan["status"] == "retry":
+                print(f"OCR abandoned after {scan['timings']['total']:.1f}s, the visitor has to retry")
+            extracted_name, id_type, registration_number = scan["name"], scan["id_type"], scan["id_number"]
+            print(f"Fused {scan['frames_used']} frame(s) in {scan['timings']['total'] * 1000:.0f} ms: "
+                  f"{extracted_name} / {id_type} / {registration_number} "
+                  f"(confidence: {', '.join(f'{field} {score:.2f}' for field, score in scan['field_confidence'].items())})")
+            result = {
+                "image": images[0],
+                "status": scan["status"],
+                "timings": scan["timings"],
+                "field_confidence": scan["field_confidence"],
+                "name": extracted_name,
+                "id_type": id_type,
+                "id_number": registration_number,
+                "id_number_valid": scan["id_number_valid"],
+                "qr_code": None,
+                "qr_code_path": None,
+                "entry_id": None,
+            }
+
+            if extracted_name != "Name not found":
+                # Generate QR and insert only if name is found
+                qr_code_value = str(uuid.uuid4())
+                qr_code_path = generate_qr_code(qr_code_value)
+                print(f"Generated QR Code: {qr_code_value}")
+                print(f"Saved at: {qr_code_path}")
+
+                # A number that does not fit the card's format is still recorded, flagged for the guard to check
+                if registration_number != "Not Found" and not scan["id_number_valid"]:
+                    print(f"ID number {registration_number} does not fit the {id_type} format, flagging the entry")
+                entry_id = insert_vehicle_entry(extracted_name, id_type, registration_number, qr_code_value,
+                                                id_number_valid=scan["id_number_valid"])
+                print(f"Entry inserted with ID: {entry_id}")
+
+                # Print receipt (the Windows printing modules are only loaded when needed)
+                from receipt_printer import WindowsPrinter
+                printer = WindowsPrinter()
+                if printer.print_receipt(qr_code_path, extracted_name, id_type, registration_number):
+                    print("Receipt printed successfully")
+                else:
+                    print("Failed to print receipt (but data was saved)")
+
+                result.update(qr_code=qr_code_value, qr_code_path=qr_code_path, entry_id=entry_id)
+
+            self.result_ready.emit(result)
+        except Exception as e:
+            print(f"OCR job error: {e}")
+            self.failed.emit(str(e))
+
+
+class OCRJobExecutor(QObject):
+    """
+    Owns the OCR worker thread and hands captured images to it one job at a time.
+
+    Results are delivered back on the GUI thread through the `finished` and
+    `failed` signals, so the caller never blocks on recognition.
+
+    With OCR_SUBPROCESS enabled (the default) recognition itself runs in
+    `ocr_process`, which the caller starts (see StartupLoader) before submitting.
+    With OCR_SERVICE_URL set it runs on the OCR service through `ocr_service`
+    instead; a scan the service cannot answer comes back as a "retry".
+    """
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+    _job_requested = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.busy = False
+        self.ocr_service = ServiceClient(OCR_SERVICE_URL, timeout=SCAN_TIMEOUT) if OCR_SERVICE_URL else None
+        self.ocr_process = OCRProcess() if USE_OCR_PROCESS and self.ocr_service is None else None
+        self.thread = QThread()
+        self.worker = OCRWorker(self.ocr_process, self.ocr_service)
+        self.worker.moveToThread(self.thread)
+
+        # Cross-thread signal connections are queued, so the slots run in the worker thread
+        self._job_requested.connect(self.worker.process)
+        self.worker.result_ready.connect(self._on_result)
+        self.worker.failed.connect(self._on_failed)
+        self.thread.start()
+
+    def submit(self, images):
+        """
+        Queue frames (NumPy arrays of the same card, best first) for OCR.
+        Returns False if a job is already running.
+        """
+        if self.busy:
+            return False
+        self.busy = True
+        self._job_requested.emit(list(images))
+        return True
+
+    def _on_result(self, result):
+        self.busy = False
+        self.finished.emit(result)
+
+    def _on_failed(self, message):
+        self.busy = False
+        self.failed.emit(message)
+
+    def shutdown(self):
+        """Stop the worker thread, waiting for any running job to finish, and the OCR process."""
+        self.thread.quit()
+        self.thread.wait()
+        if self.ocr_process is not None:
+            self.ocr_process.close()
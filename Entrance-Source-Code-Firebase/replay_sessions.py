@@ -0,0 +1,181 @@
+"""
+Replay gate sessions through the scan sequence without a camera or GUI.
+
+Each source (a session recorded with RECORD_SESSIONS, a video file or a folder
+of frames) is fed frame by frame to the same ScanFlow the kiosk runs, on the
+session's own clock: OCR runs in-process as soon as a capture fires and
+advances the clock by the time it took, and the frames that arrived meanwhile
+are skipped, as the kiosk would ignore them. No time is spent waiting between
+frames, so a session replays faster than real time. Nothing is written to
+Firebase and no receipt is printed.
+
+    python replay_sessions.py sessions/20250301-081500
+    python replay_sessions.py sessions/* --save replay.json
+    python replay_sessions.py gate.mp4 --profile fast --verbose
+
+Reported per visitor: the wait for the card to be held still, each OCR
+attempt, and the time to accept (card detected -> accepted result); across
+all sessions: percentiles of those and of the OCR pipeline stages.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import cv2
+from benchmark_ocr import STAGES, percentiles
+from frame_source import open_source
+from scan_flow import ScanFlow
+
+SCAN_BUDGET = 4.0  # As in the kiosk (ocr_worker.SCAN_BUDGET)
+
+
+def replay(source, ocr_utils, time_budget=SCAN_BUDGET, max_wait=5.0):
+    """
+    Run every frame of `source` through a ScanFlow. Returns the session record:
+    frames, duration (session clock), replay time (wall clock) and the visits.
+    """
+    pending = []
+    flow = ScanFlow(lambda images: pending.append(images) or True, max_wait=max_wait)
+    # A card of an earlier session must not be served from the cache
+    ocr_utils.ocr_cache.clear()
+
+    frames, skipped, duration = 0, 0, 0.0
+    busy_until = None
+    start = time.perf_counter()
+    while True:
+        frame, timestamp = source.read()
+        if frame is None:
+            break
+        frames += 1
+        duration = timestamp
+        if busy_until is not None and timestamp < busy_until:
+            skipped += 1  # Arrived while OCR was running
+            continue
+        busy_until = None
+
+        flow.process_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), timestamp)
+        if pending:
+            images = pending.pop()
+            ocr_start = time.perf_counter()
+            try:
+                result, error = ocr_utils.scan_id_burst(images, time_budget=time_budget), None
+            except Exception as e:
+                result, error = None, str(e)
+            busy_until = timestamp + time.perf_counter() - ocr_start
+            if error is None:
+                flow.ocr_finished(result, busy_until)
+            else:
+                flow.ocr_failed(error, busy_until)
+    source.release()
+
+    visits = list(flow.visits)
+    if flow.visit is not None:
+        visits.append(flow.visit)  # Still not accepted when the session ended
+    return {
+        "frames": frames,
+        "frames_skipped": skipped,
+        "duration": duration,
+        "replay_seconds": time.perf_counter() - start,
+        "visits": [summarise_visit(visit) for visit in visits],
+    }
+
+
+def summarise_visit(visit):
+    """Latencies of one visitor, relative to when the card was detected."""
+    presented, attempts = visit["presented"], visit["attempts"]
+    summary = {
+        "presented_at": round(presented, 3),
+        "accepted": "accepted" in visit,
+        "attempts": len(attempts),
+        "wait_for_still": round(attempts[0]["captured"] - presented, 3) if attempts else None,
+        "ocr": [round(attempt["finished"] - attempt["captured"], 3) for attempt in attempts if "finished" in attempt],
+        "stages": [attempt.get("timings", {}) for attempt in attempts],
+        "time_to_accept": round(visit["accepted"] - presented, 3) if "accepted" in visit else None,
+    }
+    if "accepted" in visit:
+        summary.update(name=visit["name"], id_type=visit["id_type"], id_number=visit["id_number"])
+    return summary
+
+
+def print_session(path, session):
+    speedup = session["duration"] / session["replay_seconds"] if session["replay_seconds"] else 0.0
+    print(f"\n{path}: {session['frames']} frames, {session['duration']:.1f}s of video replayed in "
+          f"{session['replay_seconds']:.1f}s ({speedup:.1f}x), {session['frames_skipped']} skipped during OCR")
+    if not session["visits"]:
+        print("  no card detected")
+    for visit in session["visits"]:
+        ocr = ", ".join(f"{seconds:.2f}s" for seconds in visit["ocr"]) or "-"
+        outcome = (f"accepted in {visit['time_to_accept']:.2f}s: {visit['name']} / {visit['id_type']}"
+                   if visit["accepted"] else "not accepted")
+        wait = f"{visit['wait_for_still']:.2f}s" if visit["wait_for_still"] is not None else "-"
+        print(f"  t={visit['presented_at']:.1f}s  wait {wait}  OCR {ocr}  -> {outcome}")
+
+
+def summarise(sessions):
+    visits = [visit for session in sessions.values() for visit in session["visits"]]
+    stage_times = {}
+    for visit in visits:
+        for timings in visit["stages"]:
+            for stage, seconds in timings.items():
+                stage_times.setdefault(stage, []).append(seconds)
+    return {
+        "visits": len(visits),
+        "accepted": sum(visit["accepted"] for visit in visits),
+        "latency_ms": {
+            "wait_for_still": percentiles([v["wait_for_still"] for v in visits if v["wait_for_still"] is not None]),
+            "ocr_attempt": percentiles([seconds for v in visits for seconds in v["ocr"]]),
+            "time_to_accept": percentiles([v["time_to_accept"] for v in visits if v["accepted"]]),
+        },
+        "stage_latency_ms": {stage: percentiles(stage_times[stage]) for stage in STAGES if stage in stage_times},
+    }
+
+
+def print_summary(summary):
+    print(f"\n{summary['accepted']} of {summary['visits']} visitor(s) accepted")
+    print(f"\n  {'latency':<30}{'n':>5}{'p50':>9}{'p90':>9}{'max':>9}   (ms)")
+    for name, stats in list(summary["latency_ms"].items()) + list(summary["stage_latency_ms"].items()):
+        if stats["n"]:
+            print(f"  {name:<30}{stats['n']:>5}{stats['p50']:>9.1f}{stats['p90']:>9.1f}{stats['max']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded gate sessions through the scan sequence.")
+    parser.add_argument("sources", nargs="+", help="Recorded session directories, video files or folders of frames")
+    parser.add_argument("--profile", help="OCR engine profile (see ocr_utils.ENGINE_PROFILES)")
+    parser.add_argument("--budget", type=float, default=SCAN_BUDGET, help="OCR time budget per capture, in seconds")
+    parser.add_argument("--max-wait", type=float, default=5.0, help="Seconds before a capture is forced")
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline's progress output")
+    parser.add_argument("--save", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    import ocr_utils
+    if args.profile:
+        ocr_utils.configure_engine(args.profile)
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+        ocr_utils.warm_up()
+
+    sessions = {}
+    for path in args.sources:
+        try:
+            source = open_source(path)
+        except ValueError as e:
+            print(f"Skipping {path}: {e}", file=sys.stderr)
+            continue
+        with contextlib.redirect_stdout(sys.stdout if args.verbose else io.StringIO()):
+            sessions[path] = replay(source, ocr_utils, args.budget, args.max_wait)
+        print_session(path, sessions[path])
+
+    summary = summarise(sessions)
+    print_summary(summary)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as fh:
+            json.dump({"meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S")}, "sessions": sessions,
+                       "summary": summary}, fh, indent=2)
+        print(f"\nSaved report to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
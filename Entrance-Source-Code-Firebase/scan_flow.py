@@ -0,0 +1,219 @@
+import cv2
+import numpy as np
+from frame_quality import FrameBuffer, StabilityDetector
+from ocr_utils import crop_card, guide_box
+
+EDGE_COUNT_MIN = 20000  # Canny edge pixels that signal a card in front of the camera (adjust per camera)
+# A card being read fills the guide box (a quarter of the frame); fewer edges than this there means it is gone
+PRESENT_EDGE_MIN = EDGE_COUNT_MIN // 4
+ABSENT_FRAMES = 10  # Consecutive frames without the card before the visit is dropped (~330 ms at 30 fps)
+MAX_AUTO_CAPTURES = 3  # Automatic captures per visit before the visitor is asked to take the card out
+COOLDOWN_SECONDS = 7
+
+
+class ScanFlow:
+    """
+    The entrance scan sequence without the GUI: detect a card, wait for it to
+    be held still, capture the best frames, hand them to OCR, then cool down.
+
+    `state` is "detect" (looking for a card), "waiting" (card presented, the
+    stability trigger armed), "processing" (OCR submitted), "remove" (the
+    card could not be read in MAX_AUTO_CAPTURES tries and has to be taken
+    out) or "cooldown" (after a visitor was accepted); `message` is the
+    prompt to show. While waiting (or waiting for the card to be removed) the
+    guide box is checked for the card; once it is gone the visit is dropped
+    and the sequence goes back to detecting.
+
+    Time is passed in by the caller (`now`, in seconds) rather than read from a
+    clock, so a recorded session can be replayed faster than real time.
+    `submit(card_images)` queues OCR and returns False if OCR is busy; its
+    outcome is reported back through `ocr_finished` or `ocr_failed`.
+
+    The timeline of the visitor being served is kept in `visit` ("number",
+    "presented", then one "attempts" entry per OCR run with its "captured" and
+    "finished" times) and moved to `visits` once accepted or dropped. Buffered
+    frames are tagged with the visit number, so a capture never sends an
+    earlier visitor's frames to OCR.
+    """
+
+    def __init__(self, submit, burst_size=3, max_wait=5.0, cooldown=COOLDOWN_SECONDS, capture_writer=None):
+        self.submit = submit
+        self.burst_size = burst_size  # Frames OCR'd and fused per capture when the first read is not conclusive
+        self.cooldown = cooldown
+        self.capture_writer = capture_writer  # Optional archive of captured frames (see CaptureWriter)
+        self.stability = StabilityDetector(max_wait=max_wait)  # Captures once the card is still, at most max_wait after detection
+        self.frame_buffer = FrameBuffer(size=8)  # Recent frames scored for blur, glare and motion
+        self.state = "detect"
+        self.message = "Place your ID inside the box"
+        self.cooldown_until = None
+        self.visit = None
+        self.visits = []
+        self.visit_count = 0
+        self.absent_frames = 0
+
+    def process_frame(self, gray_frame, now, ocr_busy=False):
+        """Advance the sequence with a new grayscale camera frame."""
+        if self.state == "cooldown":
+            if now < self.cooldown_until:
+                return
+            print("Cooldown finished. Ready to detect another ID.")
+            self.frame_buffer.clear()
+            self.state = "detect"
+            self.message = "Place your ID inside the box"
+
+        if self.state == "detect":
+            if self.detect_id(gray_frame):
+                self.begin_visit(now)
+                self.start_countdown(now)
+        elif self.state in ("waiting", "remove") and not ocr_busy:
+            if not self.card_still_present(gray_frame):
+                return
+            # Score frames while the card is presented; capture fires once it is held still
+            if self.state == "waiting":
+                self.update_countdown(gray_frame, now)
+
+    def detect_id(self, gray_frame):
+        """
+        Detect the presence of an ID in the frame using edge detection.
+        Returns True if an ID is detected, otherwise False.
+        """
+        edges = cv2.Canny(gray_frame, 100, 200)
+        if np.count_nonzero(edges) > EDGE_COUNT_MIN:
+            print("ID detected automatically! Waiting for the card to be held still...")
+            return True
+        return False
+
+    def card_still_present(self, gray_frame):
+        """
+        Check the guide box for the card of the current visit. After ABSENT_FRAMES frames
+        without it the visit is dropped and the sequence goes back to "detect". Returns False then.
+        """
+        x1, y1, x2, y2 = guide_box(gray_frame.shape)
+        if np.count_nonzero(cv2.Canny(gray_frame[y1:y2, x1:x2], 100, 200)) >= PRESENT_EDGE_MIN:
+            self.absent_frames = 0
+            return True
+        self.absent_frames += 1
+        if self.absent_frames < ABSENT_FRAMES:
+            return True
+
+        print("ID removed, waiting for the next card...")
+        if self.visit is not None:
+            self.visits.append(self.visit)
+        self.visit = None
+        self.frame_buffer.clear()
+        self.state = "detect"
+        self.message = "Place your ID inside the box"
+        return False
+
+    def begin_visit(self, now):
+        """Start the timeline of a new visitor; frames buffered for anyone before are dropped."""
+        self.visit_count += 1
+        self.visit = {"number": self.visit_count, "presented": now, "attempts": []}
+        self.frame_buffer.clear()
+        self.absent_frames = 0
+
+    def push_to_frame_buffer(self, gray_frame):
+        """Add a frame to the rolling quality buffer, measuring quality inside the guide box."""
+        if self.frame_buffer.region is None:
+            self.frame_buffer.region = guide_box(gray_frame.shape)
+        return self.frame_buffer.push(gray_frame, visit=self.visit_count)
+
+    def start_countdown(self, now):
+        """Arm the stability trigger: capture as soon as the card is held still, or after the maximum wait."""
+        # Only frames captured while waiting are candidates for OCR
+        self.frame_buffer.clear()
+        self.stability.reset(now)
+        self.state = "waiting"
+        self.message = "Hold the ID still"
+
+    def update_countdown(self, gray_frame, now):
+        """Feed a frame to the stability trigger and capture once it fires."""
+        quality = self.push_to_frame_buffer(gray_frame)
+        state = self.stability.update(quality["motion"], now)
+
+        if state == "waiting":
+            self.message = f"Hold the ID still: {self.stability.remaining(now):.0f}"
+            return
+
+        print("Card held still, capturing..." if state == "stable" else "Maximum wait reached, capturing...")
+        self.capture(now)
+
+    def capture(self, now, gray_frame=None):
+        """
+        Submit the best buffered frames to OCR, adding `gray_frame` (a manual
+        capture) to the buffer first. Returns True if OCR was started.
+        """
+        if self.visit is None:  # Manual capture without a detected card
+            self.begin_visit(now)
+        if gray_frame is not None:
+            self.push_to_frame_buffer(gray_frame)
+
+        # Pick the sharpest glare-free frames of this visitor instead of whatever was read last
+        best_frames = self.frame_buffer.best_n(self.burst_size, visit=self.visit["number"])
+        if not best_frames:
+            print("No frame passed the quality gate (blur/glare/motion), skipping OCR and re-arming capture...")
+            self.start_countdown(now)
+            return False
+        gray_frame, quality = best_frames[0]
+        print(f"Best frame: sharpness={quality['sharpness']:.0f}, glare={quality['glare']:.3f}, motion={quality['motion']:.1f}")
+
+        # Keeping a copy on disk is optional and happens in the background
+        if self.capture_writer is not None:
+            self.capture_writer.save(gray_frame)
+
+        # Only the rectified card inside the guide box is sent to OCR;
+        # the extra frames are only OCR'd if the best one gives an incomplete or low-confidence read
+        card_images = [crop_card(candidate) for candidate, _ in best_frames]
+        if not self.submit(card_images):
+            print("OCR already in progress, ignoring capture request.")
+            return False
+
+        self.visit["attempts"].append({"captured": now})
+        self.state = "processing"
+        self.message = "Processing..."
+        return True
+
+    def retry(self, now):
+        """Arm the capture again after a failed read, unless this visitor already had MAX_AUTO_CAPTURES tries."""
+        if self.visit is not None and len(self.visit["attempts"]) >= MAX_AUTO_CAPTURES:
+            print(f"No usable read in {MAX_AUTO_CAPTURES} captures, waiting for the card to be taken out...")
+            self.state = "remove"
+            self.message = "Could not read the ID. Take it out and try again"
+            return
+        self.start_countdown(now)
+
+    def ocr_finished(self, result, now):
+        """
+        Take the OCR result of the last capture. Returns True if the visitor was
+        accepted (the sequence cools down), False if the card has to be read again.
+        """
+        if self.visit is not None and self.visit["attempts"]:
+            self.visit["attempts"][-1].update(finished=now, status=result["status"], timings=result.get("timings", {}))
+
+        if result["status"] == "retry":
+            print("OCR took too long and was abandoned, waiting for another stable capture...")
+            self.retry(now)
+            return False
+
+        if result["name"] == "Name not found":
+            print("Name not found, waiting for another stable capture...")
+            self.retry(now)
+            return False
+
+        if self.visit is not None:
+            self.visit.update(accepted=now, name=result["name"], id_type=result["id_type"], id_number=result["id_number"])
+            self.visits.append(self.visit)
+        self.visit = None
+        # Nothing of this visitor may be captured for the next one (a manual capture during the cooldown)
+        self.frame_buffer.clear()
+        self.state = "cooldown"
+        self.cooldown_until = now + self.cooldown
+        print(f"Cooldown: {self.cooldown} seconds")
+        return True
+
+    def ocr_failed(self, message, now):
+        """Retry after OCR reports an error."""
+        print(f"OCR failed ({message}), waiting for another stable capture...")
+        if self.visit is not None and self.visit["attempts"]:
+            self.visit["attempts"][-1].update(finished=now, status="error")
+        self.retry(now)
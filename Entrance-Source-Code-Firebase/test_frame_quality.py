@@ -0,0 +1,21 @@
+from frame_quality import StabilityDetector
+
+
+def test_stable_after_enough_still_frames():
+    detector = StabilityDetector(motion_threshold=3.0, stable_frames=3, max_wait=5.0)
+    states = [detector.update(0.5, i / 30) for i in range(5)]
+    # The first frame after a reset has nothing to be still against
+    assert states == ["waiting", "waiting", "waiting", "stable", "stable"]
+
+
+def test_motion_starts_the_count_again():
+    detector = StabilityDetector(motion_threshold=3.0, stable_frames=3, max_wait=5.0)
+    states = [detector.update(motion, i / 30) for i, motion in enumerate([0, 1, 1, 9, 1, 1, 1])]
+    assert states[3:] == ["waiting", "waiting", "waiting", "stable"]
+
+
+def test_timeout_once_the_wait_is_over():
+    detector = StabilityDetector(motion_threshold=3.0, stable_frames=3, max_wait=5.0)
+    detector.reset(10.0)
+    assert detector.update(9.0, 12.0) == "waiting" and detector.remaining(12.0) == 3.0
+    assert detector.update(9.0, 15.0) == "timeout" and detector.remaining(16.0) == 0.0
@@ -0,0 +1,64 @@
+from id_templates import ID_TEMPLATES, KEYWORD_MATCHER, find_id_type, keyword_types, rank_id_types
+
+
+def test_read_number_skips_a_first_hit_that_does_not_fit():
+    # "ROBERTO" fits the PRC number regex and comes first, but not the format
+    text = "PROFESSIONAL REGULATION COMMISSION ROBERTO SANTOS REGISTRATION NO 0012345"
+    assert ID_TEMPLATES["PRC ID"].read_number(text) == ("0012345", True)
+
+
+def test_read_number_corrects_lookalikes():
+    assert ID_TEMPLATES["Philippine National ID"].read_number("1234-5678-9101-12I3") == ("1234-5678-9101-1213", True)
+
+
+def test_read_number_returns_the_first_hit_when_nothing_fits():
+    assert ID_TEMPLATES["PRC ID"].read_number("ROBERTO SANTOS") == ("ROBERTO", False)
+
+
+def test_find_name_strips_a_label_glued_onto_the_name():
+    text = "POSTAL IDENTITY CARD JUANA REYES DELA CRUZAddress 123 MAIN ST PRN 100141234567P"
+    assert ID_TEMPLATES["Postal ID"].find_name(text) == "JUANA REYES DELA CRUZ"
+
+
+def test_rank_id_types_reads_a_misread_header_over_a_stray_generic_word():
+    text = ("Republika ng Pilipinas PAMBANSANG PAGKAKAKILANLAN Philippine ldentification Card "
+            "Apelyido/Last Name DELA CRUZ Mga Pangalan JUAN POSTAL")
+    ranking = rank_id_types(text)
+    assert [id_type for id_type, _ in ranking] == ["Philippine National ID", "Postal ID"]
+    assert ranking[0][1] > 3 * ranking[1][1]
+
+
+def test_rank_id_types_scores_fuzzy_headers_below_their_full_weight():
+    text = "PR0FESSIONAL REGULATI0N COMMISSLON PROFESSIONAL IDENTIFICATION CARO LAST NAME CRUZ"
+    [(id_type, score)] = rank_id_types(text)
+    assert id_type == "PRC ID" and 3 < score < 6
+
+
+def test_rank_id_types_without_keywords_is_empty():
+    assert rank_id_types("HELLO WORLD 1234") == []
+    assert find_id_type("HELLO WORLD 1234") is None
+
+
+def test_keyword_matcher_takes_short_keywords_only_as_words():
+    assert keyword_types("CRN-0028-1215160-9") == {"Unified Multi-Purpose ID/SSS ID"}
+    assert keyword_types("ACRN SCORN") == set()
+
+
+def test_keyword_matcher_finds_headers_read_without_spaces():
+    assert keyword_types("PAMBANSANGPAGKAKAKILANLAN") == {"Philippine National ID"}
+    assert KEYWORD_MATCHER.search("postalidentitycard") is not None
+
+
+def test_unwanted_words_drop_labels_and_misread_labels():
+    unwanted = ID_TEMPLATES["Unified Multi-Purpose ID/SSS ID"].unwanted
+    assert unwanted.remove("SURNAME DELA CRUZ GIVEN NAME JUAN SEX") == "DELA CRUZ JUAN"
+    assert unwanted.remove("DATE 0F BIRTH JUAN") == "JUAN"
+
+
+def test_unwanted_words_cut_glued_labels_but_keep_lookalike_names():
+    unwanted = ID_TEMPLATES["Unified Multi-Purpose ID/SSS ID"].unwanted
+    assert unwanted.remove("JUAN SANTOS SEXADDRESS") == "JUAN SANTOS"
+    assert unwanted.remove("Address:CRUZ") == "CRUZ"
+    assert unwanted.remove("MALENA CRUZ") == "MALENA CRUZ"
+    # Seven-letter labels need 90, so a word one letter off stays ("WRIGHT" is not "WEIGHT")
+    assert unwanted.remove("JUAN SANTOS ADORESS") == "JUAN SANTOS ADORESS"
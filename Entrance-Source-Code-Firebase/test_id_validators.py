@@ -0,0 +1,29 @@
+from id_validators import NumberFormat
+
+UMID = NumberFormat(("CRN-9999-9999999-9",))
+POSTAL = NumberFormat(("PRN 999999999999A", "PRN A99999999999"))
+
+
+def test_lookalikes_are_read_as_the_kind_each_position_needs():
+    assert UMID.validate("CRN-OO28-1215160-9") == ("CRN-0028-1215160-9", True)
+    assert UMID.validate("CRN-0028-1215160-G") == ("CRN-0028-1215160-6", True)
+
+
+def test_more_corrections_than_allowed_is_not_a_fit():
+    assert UMID.validate("CRN-OO28-12I5160-9") == ("CRN-OO28-12I5160-9", False)
+
+
+def test_separators_may_be_dropped_but_not_moved():
+    assert UMID.validate("CRN002812151609") == ("CRN002812151609", True)
+    assert UMID.validate("CRN-00281-215160-9")[1] is False
+
+
+def test_letter_positions_are_not_corrected():
+    assert POSTAL.validate("PRN 100141234567P") == ("PRN 100141234567P", True)
+    assert POSTAL.validate("PRN E20220548293") == ("PRN E20220548293", True)
+    assert POSTAL.validate("PRN 1001412345678")[1] is False
+
+
+def test_search_finds_a_misread_number_in_text():
+    assert POSTAL.search("POSTAL PRN 1OO141234567P MAIN ST") == "PRN 100141234567P"
+    assert POSTAL.search("POSTAL IDENTITY CARD JUAN DELA CRUZ") is None
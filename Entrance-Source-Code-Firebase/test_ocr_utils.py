@@ -0,0 +1,67 @@
+import numpy as np
+from ocr_pool import retry_result
+from ocr_service import ServiceClient
+from ocr_utils import OCRResultCache, fuse_scan_results, scan_id_burst
+
+
+def read(name, id_type="PRC ID", id_number="0012345", valid=True, confidence=0.9):
+    """A scan_id result with every field read at `confidence`."""
+    return dict(retry_result(0.5), name=name, id_type=id_type, id_number=id_number, id_number_valid=valid,
+                status="ok", confidence=confidence,
+                field_confidence={"name": confidence, "id_type": confidence, "id_number": confidence})
+
+
+def test_cache_hits_a_near_identical_hash_within_its_ttl():
+    cache = OCRResultCache(ttl=5.0, max_distance=2)
+    cache.put(0b1111, ["words"], now=0.0)
+    assert cache.get(0b1100, now=4.0) == ["words"]  # 2 bits apart
+    assert cache.get(0b1000, now=4.0) is None  # 3 bits apart
+
+
+def test_cache_forgets_entries_past_their_ttl_even_after_hits():
+    cache = OCRResultCache(ttl=5.0, max_distance=2)
+    cache.put(0b1111, ["words"], now=0.0)
+    assert cache.get(0b1111, now=4.0) == ["words"]
+    assert cache.get(0b1111, now=5.5) is None and len(cache) == 0
+
+
+def test_cache_clear_and_size_limit():
+    cache = OCRResultCache(max_entries=2, ttl=5.0, max_distance=0)
+    for image_hash in (1, 2, 3):
+        cache.put(image_hash, [image_hash], now=0.0)
+    assert cache.get(1, now=0.0) is None and cache.get(3, now=0.0) == [3]
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_fusion_votes_the_type_then_the_fields_of_that_type():
+    fused = fuse_scan_results([read("JUAN DELA CRUZ"), read("JUAN DELA CRUZ", confidence=0.7),
+                               read("ROBERTO SANTOS", id_type="Postal ID", confidence=0.95)])
+    assert fused["id_type"] == "PRC ID" and fused["name"] == "JUAN DELA CRUZ" and fused["frames_used"] == 3
+
+
+def test_fusion_prefers_a_number_that_fits_the_format():
+    fused = fuse_scan_results([read("JUAN DELA CRUZ", id_number="OO12345", valid=False, confidence=0.95),
+                               read("JUAN DELA CRUZ", id_number="OO12345", valid=False, confidence=0.95),
+                               read("JUAN DELA CRUZ", id_number="0012345", confidence=0.6)])
+    assert fused["id_number"] == "0012345" and fused["id_number_valid"]
+    assert fused["field_confidence"]["id_number"] == 0.6
+
+
+def test_fusion_of_nothing_found():
+    fused = fuse_scan_results([retry_result(0.5)])
+    assert fused["name"] == "Name not found" and fused["id_type"] == "Unknown ID Type"
+    assert not fused["id_number_valid"]
+
+
+def test_unreachable_service_ends_the_burst_with_a_retry():
+    client = ServiceClient("http://127.0.0.1:1", timeout=1.0)
+    scan = scan_id_burst([np.zeros((50, 50, 3), np.uint8)] * 3, time_budget=4.0, scan=client.scan)
+    assert scan["status"] == "retry" and client.failures == 1
+
+
+def test_retry_after_an_answer_keeps_the_answer():
+    first = read("JUAN DELA CRUZ", confidence=0.8)
+    runs = iter([first, retry_result(1.0), first])
+    scan = scan_id_burst([None] * 3, scan=lambda image, use_cache, deadline: next(runs))
+    assert scan["status"] == "ok" and scan["name"] == "JUAN DELA CRUZ" and scan["frames_used"] == 1
@@ -0,0 +1,121 @@
+import cv2
+import numpy as np
+from ocr_utils import crop_card
+from scan_flow import ScanFlow
+
+
+def card(seed):
+    """A 1280x720 camera frame with a text-covered card in the guide box."""
+    frame = np.full((720, 1280), 40, np.uint8)
+    rng = np.random.default_rng(seed)
+    cv2.rectangle(frame, (320, 180), (960, 540), 220, -1)
+    for i in range(20):
+        text = "".join(rng.choice(list("ABCDEFGHKMW"), 22))
+        cv2.putText(frame, text, (330, 200 + 17 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.6, 20, 1)
+    return frame
+
+
+def accepted(name="JUAN DELA CRUZ"):
+    return {"status": "ok", "name": name, "id_type": "PRC ID", "id_number": "**12345"}
+
+
+def run_until_capture(flow, frame, now, max_frames=300):
+    for _ in range(max_frames):
+        if flow.state == "processing":
+            break
+        flow.process_frame(frame, now)
+        now += 1 / 30
+    return now
+
+
+def test_card_held_still_is_captured_then_accepted():
+    sent = []
+    flow = ScanFlow(lambda images: sent.append(images) or True)
+    now = run_until_capture(flow, card(1), 0.0)
+    assert flow.state == "processing" and len(sent) == 1
+    assert flow.ocr_finished(accepted(), now)
+    assert flow.state == "cooldown" and flow.visits[0]["name"] == "JUAN DELA CRUZ"
+
+
+def test_missing_name_rearms_the_capture():
+    flow = ScanFlow(lambda images: True)
+    now = run_until_capture(flow, card(1), 0.0)
+    assert not flow.ocr_finished(accepted("Name not found"), now)
+    assert flow.state == "waiting" and flow.visit is not None
+
+
+def test_cooldown_ends_in_detect():
+    flow = ScanFlow(lambda images: True, cooldown=7)
+    now = run_until_capture(flow, card(1), 0.0)
+    flow.ocr_finished(accepted(), now)
+    flow.process_frame(card(1), now + 1)
+    assert flow.state == "cooldown"
+    flow.process_frame(np.full((720, 1280), 40, np.uint8), now + 8)
+    assert flow.state == "detect"
+
+
+def test_manual_capture_after_accept_sends_only_the_new_frame():
+    sent = []
+    flow = ScanFlow(lambda images: sent.append(images) or True)
+    now = run_until_capture(flow, card(1), 0.0)
+    flow.ocr_finished(accepted(), now)
+    sent.clear()
+
+    assert flow.capture(now + 1, card(2))
+    assert len(sent[0]) == 1
+    assert np.array_equal(sent[0][0], crop_card(card(2)))
+
+
+def test_removed_card_drops_the_visit_and_stops_capturing():
+    sent = []
+    flow = ScanFlow(lambda images: sent.append(images) or True)
+    now = run_until_capture(flow, card(1), 0.0)
+    flow.ocr_finished(accepted("Name not found"), now)
+    empty = np.full((720, 1280), 40, np.uint8)
+    for _ in range(300):
+        now += 1 / 30
+        flow.process_frame(empty, now)
+    assert flow.state == "detect" and flow.visit is None
+    assert len(sent) == 1 and len(flow.visits) == 1 and "accepted" not in flow.visits[0]
+
+
+def test_capture_cap_asks_for_the_card_to_be_taken_out():
+    sent = []
+    flow = ScanFlow(lambda images: sent.append(images) or True)
+    now = 0.0
+    for _ in range(5):
+        now = run_until_capture(flow, card(1), now)
+        if flow.state != "processing":
+            break
+        flow.ocr_finished(accepted("Name not found"), now)
+    assert flow.state == "remove" and len(sent) == 3
+    flow.process_frame(np.full((720, 1280), 40, np.uint8), now)
+    assert flow.state == "remove"
+    for _ in range(10):
+        now += 1 / 30
+        flow.process_frame(np.full((720, 1280), 40, np.uint8), now)
+    assert flow.state == "detect"
+
+
+def test_empty_scene_stays_in_detect_and_a_card_starts_a_visit():
+    flow = ScanFlow(lambda images: True)
+    flow.process_frame(np.full((720, 1280), 40, np.uint8), 0.0)
+    assert flow.state == "detect" and flow.visit is None
+    flow.process_frame(card(1), 0.1)
+    assert flow.state == "waiting" and flow.visit["number"] == 1
+
+
+def test_ocr_error_and_abandoned_ocr_rearm_the_capture():
+    flow = ScanFlow(lambda images: True)
+    now = run_until_capture(flow, card(1), 0.0)
+    flow.ocr_failed("model crashed", now)
+    assert flow.state == "waiting" and flow.visit["attempts"][-1]["status"] == "error"
+    now = run_until_capture(flow, card(1), now)
+    assert not flow.ocr_finished(dict(accepted(), status="retry"), now)
+    assert flow.state == "waiting" and len(flow.visit["attempts"]) == 2
+
+
+def test_busy_ocr_keeps_waiting_without_an_attempt():
+    flow = ScanFlow(lambda images: False)
+    run_until_capture(flow, card(1), 0.0, max_frames=30)
+    assert flow.state == "waiting" and flow.visit["attempts"] == []